@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api import authentication, bitmaps, cache, reference, suggest
+        from api import checks  # noqa: F401 регистрирует проверки
+
+        authentication.connect_signals()
+        bitmaps.connect_signals()
+        cache.connect_signals()
+        reference.connect_signals()
+        suggest.connect_signals()
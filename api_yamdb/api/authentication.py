@@ -0,0 +1,79 @@
+"""JWT-аутентификация без запроса пользователя к базе.
+
+`token()` кладёт в токен роль и признак суперпользователя. По ним
+собирается ClaimsUser — этого хватает классам разрешений и созданию
+отзывов и комментариев. Чтобы разжалованный администратор не сохранял
+права до истечения токена, утверждения сверяются с версией роли —
+кортежем (role, is_superuser, is_active) из кеша. Версия живёт
+`ROLE_VERSION_TTL` секунд и сбрасывается при сохранении и удалении
+пользователя; при расхождении пользователь загружается из базы как
+обычно.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from reviews.models import ClaimsUser, CustomUser
+
+KEY_PREFIX = 'role-version'
+DELETED = 'deleted'
+
+
+def role_version_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def role_version(user_id):
+    """(role, is_superuser, is_active) пользователя из кеша или базы."""
+    key = role_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = CustomUser.objects.filter(pk=user_id).values_list(
+            'role', 'is_superuser', 'is_active'
+        ).first()
+        version = row if row is not None else DELETED
+        cache.set(key, version, settings.ROLE_VERSION_TTL)
+    return None if version == DELETED else tuple(version)
+
+
+def token_for_user(user):
+    """Refresh-токен с ролью пользователя в утверждениях."""
+    refresh = RefreshToken.for_user(user)
+    refresh['username'] = user.username
+    refresh['role'] = user.role
+    refresh['is_superuser'] = user.is_superuser
+    return refresh
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+            claims = (
+                validated_token['role'], validated_token['is_superuser'],
+                True,
+            )
+            username = validated_token['username']
+        except KeyError:
+            # Токен выпущен без утверждений о роли.
+            return super().get_user(validated_token)
+        if role_version(user_id) != claims:
+            return super().get_user(validated_token)
+        return ClaimsUser.from_claims(
+            id=user_id, username=username, role=claims[0],
+            is_superuser=claims[1], is_active=True,
+        )
+
+
+def user_changed(sender, instance, **kwargs):
+    cache.delete(role_version_key(instance.pk))
+
+
+def connect_signals():
+    for signal in (post_save, post_delete):
+        signal.connect(user_changed, sender=CustomUser)
+        signal.connect(user_changed, sender=ClaimsUser)
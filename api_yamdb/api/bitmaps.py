@@ -0,0 +1,305 @@
+"""Битовые индексы произведений по жанру, категории и году.
+
+Каждому жанру, категории и году соответствует битовая карта в виде
+целого числа Python, где бит с номером первичного ключа отмечает
+произведение. Номера битов не зависят от порядка сортировки, поэтому
+сохранение произведения меняет только его собственные биты.
+Комбинация фильтров — это пересечение карт; найденные ключи уходят в
+базу условием `pk IN (...)`, а сортировку и страницу по `ordering`
+модели выполняет СУБД. Если под фильтр попадает больше
+`TITLE_BITMAP_MAX_IDS` произведений, фильтрует SQL.
+
+Индекс включается настройкой `TITLE_BITMAP_INDEX`, обновляется
+сигналами моделей и перестраивается раз в `TITLE_BITMAP_INDEX_TTL`
+секунд, чтобы подхватить изменения других процессов. Перестройка идёт
+в фоновом потоке, а запросы тем временем читают старые карты.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from reviews.models import Category, Genre, Title
+
+FILTER_PARAMS = {'genre', 'category', 'year'}
+PAGINATION_PARAMS = {'page', 'format'}
+
+
+def bitmap_of(pks):
+    """Карта с битами `pks`; строится за один проход по байтам."""
+    if not pks:
+        return 0
+    data = bytearray(max(pks) // 8 + 1)
+    for pk in pks:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, 'little')
+
+
+def iter_bits(bitmap):
+    """Номера установленных битов по возрастанию."""
+    bits = bin(bitmap)[:1:-1]
+    position = bits.find('1')
+    while position >= 0:
+        yield position
+        position = bits.find('1', position + 1)
+
+
+class TitleBitmapIndex:
+    """Битовые карты первичных ключей произведений по значениям фильтров."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # pk -> (год, категория, жанры): какие биты ставить и снимать.
+            self.titles = {}
+            self.genres = {}
+            self.categories = {}
+            self.years = {}
+            self.genre_slugs = {}
+            self.category_slugs = {}
+            self.built_at = None
+            # Изменения по сигналам во время фоновой перестройки; None —
+            # перестройка не идёт.
+            self.changes = None
+
+    def enabled(self):
+        return getattr(settings, 'TITLE_BITMAP_INDEX', False)
+
+    def is_stale(self):
+        ttl = getattr(settings, 'TITLE_BITMAP_INDEX_TTL', 60)
+        return self.built_at is None or time.monotonic() - self.built_at > ttl
+
+    def build(self):
+        titles = {
+            pk: (year, category_id, set())
+            for pk, year, category_id in Title.objects.order_by().values_list(
+                'id', 'year', 'category_id'
+            ).iterator()
+        }
+        for title_id, genre_id in Title.genre.through.objects.values_list(
+            'title_id', 'genre_id'
+        ).iterator():
+            titles[title_id][2].add(genre_id)
+        members = ({}, {}, {})
+        for pk, record in titles.items():
+            for bitmaps, value in zip(members, self.values_of(record)):
+                for item in value:
+                    bitmaps.setdefault(item, []).append(pk)
+        years, categories, genres = (
+            {value: bitmap_of(pks) for value, pks in bitmaps.items()}
+            for bitmaps in members
+        )
+        genre_slugs = dict(Genre.objects.values_list('slug', 'id'))
+        category_slugs = dict(Category.objects.values_list('slug', 'id'))
+        with self.lock:
+            self.titles = titles
+            self.years, self.categories, self.genres = (
+                years, categories, genres
+            )
+            self.genre_slugs = genre_slugs
+            self.category_slugs = category_slugs
+            self.built_at = time.monotonic()
+            changes, self.changes = self.changes or [], None
+            for change in changes:
+                change()
+
+    def rebuild_in_background(self):
+        """Запускает перестройку, если она ещё не идёт."""
+        with self.lock:
+            if self.changes is not None:
+                return
+            self.changes = []
+        threading.Thread(target=self.background_build, daemon=True).start()
+
+    def background_build(self):
+        try:
+            self.build()
+        finally:
+            with self.lock:
+                # После ошибки следующий запрос попробует ещё раз.
+                self.changes = None
+            # У потока своё соединение с базой.
+            connection.close()
+
+    @staticmethod
+    def values_of(record):
+        """Значения года, категории и жанров произведения."""
+        year, category_id, genre_ids = record
+        return (
+            (year,),
+            () if category_id is None else (category_id,),
+            genre_ids,
+        )
+
+    def bitmaps(self):
+        return self.years, self.categories, self.genres
+
+    def refresh(self):
+        """Первый раз строит индекс сразу, устаревший — в фоне."""
+        if self.built_at is None:
+            self.build()
+        elif self.is_stale():
+            self.rebuild_in_background()
+
+    def filter(self, queryset, params):
+        """Queryset по найденным ключам или None, если фильтрует SQL."""
+        if not set(params) <= FILTER_PARAMS | PAGINATION_PARAMS:
+            return None
+        if not any(params.get(name) for name in FILTER_PARAMS):
+            # Без фильтров база сама отдаёт страницу по сортировке.
+            return None
+        year = params.get('year')
+        try:
+            year = int(year) if year else None
+        except ValueError:
+            return None
+        self.refresh()
+        with self.lock:
+            bitmap = -1
+            if params.get('genre'):
+                bitmap &= self.genres.get(
+                    self.genre_slugs.get(params['genre']), 0
+                )
+            if params.get('category'):
+                bitmap &= self.categories.get(
+                    self.category_slugs.get(params['category']), 0
+                )
+            if year is not None:
+                bitmap &= self.years.get(year, 0)
+        if bin(bitmap).count('1') > settings.TITLE_BITMAP_MAX_IDS:
+            return None
+        return queryset.filter(pk__in=list(iter_bits(bitmap)))
+
+    def _remove(self, pk):
+        record = self.titles.pop(pk, None)
+        if record is None:
+            return
+        mask = ~(1 << pk)
+        for bitmaps, values in zip(self.bitmaps(), self.values_of(record)):
+            for value in values:
+                if value in bitmaps:
+                    bitmaps[value] &= mask
+
+    def _insert(self, pk, record):
+        self.titles[pk] = record
+        bit = 1 << pk
+        for bitmaps, values in zip(self.bitmaps(), self.values_of(record)):
+            for value in values:
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def genre_ids_of(self, pk):
+        record = self.titles.get(pk)
+        return set() if record is None else set(record[2])
+
+    def apply(self, change):
+        """Применяет изменение и запоминает его для идущей перестройки."""
+        with self.lock:
+            if self.built_at is None:
+                return
+            if self.changes is not None:
+                self.changes.append(change)
+            change()
+
+    def save_title(self, title):
+        self.apply(lambda: self._save_title(
+            title.pk, title.year, title.category_id
+        ))
+
+    def _save_title(self, pk, year, category_id):
+        genre_ids = self.genre_ids_of(pk)
+        self._remove(pk)
+        self._insert(pk, (year, category_id, genre_ids))
+
+    def delete_title(self, pk):
+        self.apply(lambda: self._remove(pk))
+
+    def set_genres(self, title_ids, genre_ids, value):
+        title_ids, genre_ids = set(title_ids), set(genre_ids)
+        self.apply(lambda: self._set_genres(title_ids, genre_ids, value))
+
+    def _set_genres(self, title_ids, genre_ids, value):
+        for title_id in title_ids:
+            record = self.titles.get(title_id)
+            if record is None:
+                continue
+            year, category_id, genres = record
+            genres = genres | genre_ids if value else genres - genre_ids
+            self._remove(title_id)
+            self._insert(title_id, (year, category_id, genres))
+
+    def save_slug(self, model, instance):
+        self.apply(lambda: self._save_slug(model, instance.pk, instance.slug))
+
+    def _save_slug(self, model, pk, slug):
+        slugs = self.genre_slugs if model is Genre else self.category_slugs
+        for old_slug, old_pk in list(slugs.items()):
+            if old_pk == pk:
+                del slugs[old_slug]
+        slugs[slug] = pk
+
+    def delete_slug(self, model, instance):
+        self.apply(
+            lambda: self._delete_slug(model, instance.pk, instance.slug)
+        )
+
+    def _delete_slug(self, model, pk, slug):
+        if model is Genre:
+            slugs, bitmaps = self.genre_slugs, self.genres
+        else:
+            slugs, bitmaps = self.category_slugs, self.categories
+        slugs.pop(slug, None)
+        bitmaps.pop(pk, None)
+
+
+index = TitleBitmapIndex()
+
+
+def title_saved(sender, instance, **kwargs):
+    index.save_title(instance)
+
+
+def title_deleted(sender, instance, **kwargs):
+    index.delete_title(instance.pk)
+
+
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._bitmap_cleared = set(
+                instance.title_set.values_list('pk', flat=True)
+            )
+        else:
+            instance._bitmap_cleared = index.genre_ids_of(instance.pk)
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_bitmap_cleared', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+    value = action == 'post_add'
+    if reverse:
+        index.set_genres(pk_set, {instance.pk}, value)
+    else:
+        index.set_genres({instance.pk}, pk_set, value)
+
+
+def reference_saved(sender, instance, **kwargs):
+    index.save_slug(sender, instance)
+
+
+def reference_deleted(sender, instance, **kwargs):
+    index.delete_slug(sender, instance)
+
+
+def connect_signals():
+    post_save.connect(title_saved, sender=Title)
+    post_delete.connect(title_deleted, sender=Title)
+    m2m_changed.connect(title_genres_changed, sender=Title.genre.through)
+    for model in (Genre, Category):
+        post_save.connect(reference_saved, sender=model)
+        post_delete.connect(reference_deleted, sender=model)
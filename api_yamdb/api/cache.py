@@ -0,0 +1,156 @@
+"""Кеш ответов API с инвалидацией по тегам.
+
+Ответ хранится вместе с версиями тегов, от которых он зависит
+(`title:42`, `review-list:42`, `category:*`). Запись в модель сбрасывает
+версии своих тегов, и все зависящие от них ответы перестают
+совпадать с текущими версиями — остальные записи кеша не трогаются.
+Версия тега — случайный токен и время его создания; из версий
+строятся валидаторы ETag и Last-Modified для условных GET-запросов.
+Last-Modified точен до секунды, поэтому для версий текущей секунды он
+не отдаётся и не проверяется — такие ответы валидируются только по
+ETag, и запись в ту же секунду не даст ложного 304.
+Версии хранятся в отдельном кеше `tags`, где их не вытесняют ответы.
+Версии тегов должны быть общими для всех воркеров, поэтому с кешем в
+памяти процесса кеш ответов по умолчанию выключен
+(`RESPONSE_CACHE_ENABLED`).
+"""
+import hashlib
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save)
+
+from reviews.models import (Category, ClaimsUser, Comment, CustomUser, Genre,
+                            Review, Title)
+
+GLOBAL_TAG = '*'
+KEY_PREFIX = 'response-cache'
+
+
+def is_process_local():
+    return isinstance(caches['default'], LocMemCache)
+
+
+def is_enabled():
+    enabled = settings.RESPONSE_CACHE_ENABLED
+    if enabled is None:
+        return not is_process_local()
+    return enabled
+
+
+def tag_key(tag):
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def tag_versions(tags):
+    """Текущие версии тегов; отсутствующие создаются."""
+    tags_cache = caches['tags']
+    keys = [tag_key(tag) for tag in (GLOBAL_TAG, *tags)]
+    versions = tags_cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = (uuid.uuid4().hex, int(time.time()))
+            if not tags_cache.add(key, version, None):
+                # Ключ могли удалить между add и get.
+                version = tags_cache.get(key) or version
+            versions[key] = version
+    return versions
+
+
+def invalidate(*tags):
+    keys = [tag_key(tag) for tag in tags]
+    caches['tags'].delete_many(keys)
+    # Повторно после коммита: до него параллельный запрос мог прочитать
+    # старые строки и закешировать их под новыми версиями тегов.
+    transaction.on_commit(lambda: caches['tags'].delete_many(keys))
+
+
+def make_key(request):
+    url = request.build_absolute_uri()
+    return f'{KEY_PREFIX}:{hashlib.md5(url.encode()).hexdigest()}'
+
+
+def make_validators(key, versions):
+    """ETag и время последнего изменения для ответа с такими версиями.
+
+    Время равно None, если версия создана в текущую секунду.
+    """
+    tokens = ':'.join(versions[tag][0] for tag in sorted(versions))
+    etag = hashlib.md5(f'{key}:{tokens}'.encode()).hexdigest()
+    last_modified = max(version[1] for version in versions.values())
+    if last_modified >= int(time.time()):
+        last_modified = None
+    return f'"{etag}"', last_modified
+
+
+def get_response_data(key, versions):
+    entry = cache.get(key)
+    if entry is None or entry[0] != versions:
+        return None
+    return entry[1]
+
+
+def set_response_data(key, data, versions):
+    cache.set(key, (versions, data), settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def title_changed(sender, instance, **kwargs):
+    invalidate(f'title:{instance.pk}', 'title-list')
+
+
+def title_genres_changed(sender, instance, action, reverse, **kwargs):
+    if action.startswith('post_'):
+        if reverse:
+            invalidate('genre:*', 'title-list')
+        else:
+            invalidate(f'title:{instance.pk}', 'title-list')
+
+
+def review_changed(sender, instance, **kwargs):
+    # Отзыв меняет и рейтинг произведения.
+    invalidate(
+        f'review:{instance.pk}', f'review-list:{instance.title_id}',
+        f'title:{instance.title_id}', 'title-list'
+    )
+
+
+def comment_changed(sender, instance, **kwargs):
+    invalidate(f'comment:{instance.pk}', f'comment-list:{instance.review_id}')
+
+
+def reference_changed(sender, instance, **kwargs):
+    invalidate(f'{sender._meta.model_name}:*')
+
+
+def user_changed(sender, instance, created=False, **kwargs):
+    # У нового пользователя ещё нет отзывов и комментариев.
+    if not created:
+        invalidate('user:*')
+
+
+def database_reset(**kwargs):
+    invalidate(GLOBAL_TAG)
+
+
+def connect_signals():
+    for model, receiver in (
+        (Title, title_changed),
+        (Review, review_changed),
+        (Comment, comment_changed),
+        (Category, reference_changed),
+        (Genre, reference_changed),
+        (CustomUser, user_changed),
+        (ClaimsUser, user_changed),
+    ):
+        post_save.connect(receiver, sender=model)
+        post_delete.connect(receiver, sender=model)
+    m2m_changed.connect(title_genres_changed, sender=Title.genre.through)
+    post_migrate.connect(
+        database_reset, sender=apps.get_app_config('reviews')
+    )
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from api.cache import is_process_local
+
+
+@register(deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """Версии снимков и тегов кеша ответов должны быть общими воркерам."""
+    if not is_process_local():
+        return []
+    return [Warning(
+        'Кеш по умолчанию хранится в памяти процесса.',
+        hint=(
+            'Воркеры не увидят изменений справочников друг друга до '
+            'истечения REFERENCE_SNAPSHOT_MAX_AGE '
+            f'({settings.REFERENCE_SNAPSHOT_MAX_AGE} с), а кеш ответов '
+            'по умолчанию выключен. Настройте разделяемый бэкенд: '
+            'DJANGO_CACHE_BACKEND и DJANGO_CACHE_LOCATION.'
+        ),
+        id='api.W001',
+    )]
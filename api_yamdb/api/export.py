@@ -0,0 +1,138 @@
+"""Потоковая выгрузка каталога произведений в NDJSON и CSV.
+
+Произведения, связи с жанрами и отзывы читаются тремя параллельными
+итераторами, упорядоченными по id произведения, и сливаются на лету,
+поэтому память не зависит от размера таблиц. Категории и жанры берутся
+из снимков справочников.
+"""
+import csv
+import json
+from itertools import groupby
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.reference import reference_data
+from reviews.models import Category, Genre, Review, Title
+
+TITLE_FIELDS = ('id', 'name', 'year', 'rating', 'description', 'category_id')
+REVIEW_FIELDS = ('id', 'author__username', 'score', 'text', 'pub_date')
+CSV_HEADER = (
+    'id', 'name', 'year', 'rating', 'description', 'category', 'genre',
+)
+CSV_REVIEW_HEADER = (
+    'review_id', 'review_author', 'review_score', 'review_text',
+    'review_pub_date',
+)
+
+
+def grouped_by_title(rows):
+    """Пары (title_id, строки) по строкам, упорядоченным по title_id."""
+    return groupby(rows, key=lambda row: row[0])
+
+
+def iter_titles(with_reviews):
+    """Произведения с жанрами и, по желанию, отзывами."""
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    categories = reference_data(Category).get().by_id
+    genres = reference_data(Genre).get().by_id
+    genre_links = grouped_by_title(
+        Title.genre.through.objects.order_by('title_id', 'genre__slug')
+        .values_list('title_id', 'genre_id').iterator(chunk_size)
+    )
+    review_rows = grouped_by_title(
+        Review.objects.order_by('title_id', 'id')
+        .values_list('title_id', *REVIEW_FIELDS).iterator(chunk_size)
+        if with_reviews else ()
+    )
+    next_genres = next(genre_links, None)
+    next_reviews = next(review_rows, None)
+    for row in Title.objects.order_by('id').values_list(
+        *TITLE_FIELDS
+    ).iterator(chunk_size):
+        title = dict(zip(TITLE_FIELDS, row))
+        category = categories.get(title.pop('category_id'))
+        title['category'] = category
+        title['genre'] = []
+        while next_genres is not None and next_genres[0] <= title['id']:
+            if next_genres[0] == title['id']:
+                title['genre'] = [
+                    genres[genre_id] for _, genre_id in next_genres[1]
+                    if genre_id in genres
+                ]
+            next_genres = next(genre_links, None)
+        if with_reviews:
+            title['reviews'] = []
+            while (next_reviews is not None
+                   and next_reviews[0] <= title['id']):
+                if next_reviews[0] == title['id']:
+                    title['reviews'] = [
+                        dict(zip(REVIEW_FIELDS, review[1:]))
+                        for review in next_reviews[1]
+                    ]
+                next_reviews = next(review_rows, None)
+        yield title
+
+
+def reference_dict(obj):
+    return {'name': obj.name, 'slug': obj.slug}
+
+
+def review_dict(review):
+    return {
+        'id': review['id'],
+        'text': review['text'],
+        'author': review['author__username'],
+        'score': review['score'],
+        'pub_date': review['pub_date'],
+    }
+
+
+def export_ndjson(with_reviews):
+    for title in iter_titles(with_reviews):
+        title['category'] = (
+            reference_dict(title['category']) if title['category'] else None
+        )
+        title['genre'] = [reference_dict(genre) for genre in title['genre']]
+        if with_reviews:
+            title['reviews'] = [
+                review_dict(review) for review in title['reviews']
+            ]
+        yield json.dumps(title, cls=DjangoJSONEncoder,
+                         ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Файлоподобный объект, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(with_reviews):
+    writer = csv.writer(Echo())
+    header = CSV_HEADER + (CSV_REVIEW_HEADER if with_reviews else ())
+    yield writer.writerow(header)
+    for title in iter_titles(with_reviews):
+        row = (
+            title['id'], title['name'], title['year'], title['rating'],
+            title['description'],
+            title['category'].slug if title['category'] else '',
+            '|'.join(genre.slug for genre in title['genre']),
+        )
+        if not with_reviews:
+            yield writer.writerow(row)
+            continue
+        if not title['reviews']:
+            yield writer.writerow(row + ('',) * len(CSV_REVIEW_HEADER))
+        for review in title['reviews']:
+            yield writer.writerow(row + (
+                review['id'], review['author__username'], review['score'],
+                review['text'], review['pub_date'].isoformat(),
+            ))
+
+
+EXPORT_FORMATS = {
+    'ndjson': (export_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (export_csv, 'text/csv; charset=utf-8', 'csv'),
+}
@@ -1,5 +1,10 @@
 import django_filters as filters
-from reviews.models import Title
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from reviews.models import Category, Genre, Title
+from reviews.search import search_titles
 
 
 class GenreTitleFilter(filters.FilterSet):
@@ -13,3 +18,50 @@ class GenreTitleFilter(filters.FilterSet):
     class Meta:
         model = Title
         fields = ["genre", "category", "name", "year"]
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по названию и описанию произведений."""
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_titles(queryset, query)
+
+
+TITLE_FACETS = {
+    'genre': (Genre, 'title', ('slug', 'name')),
+    'category': (Category, 'titles', ('slug', 'name')),
+    'year': (Title, 'pk', ('year',)),
+}
+
+
+def parse_title_facets(facets):
+    """Список фасетов из параметра `facets`; неизвестные — ошибка 400."""
+    facets = [facet.strip() for facet in facets.split(',') if facet.strip()]
+    unknown = set(facets) - set(TITLE_FACETS)
+    if unknown:
+        raise ValidationError({'facets': (
+            f'Неизвестные фасеты: {", ".join(sorted(unknown))}. '
+            f'Допустимые значения: {", ".join(TITLE_FACETS)}.'
+        )})
+    return facets
+
+
+def get_title_facets(queryset, facets):
+    """Считает произведения по значениям фасетов, один запрос на фасет."""
+    title_ids = queryset.order_by().values('pk')
+    result = {}
+    for facet in facets:
+        model, relation, fields = TITLE_FACETS[facet]
+        result[facet] = list(
+            model.objects.filter(
+                **{f'{relation}__in': title_ids}
+            ).values(*fields).annotate(
+                count=Count(relation)
+            ).order_by('-count', *fields)
+        )
+    return result
@@ -0,0 +1,394 @@
+import io
+import json
+import math
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from api.authentication import token_for_user
+from api.bitmaps import index as bitmap_index
+from api.suggest import index as suggest_index
+from reviews.models import Category, Comment, CustomUser, Genre, Title
+
+SCALES = {
+    'small': dict(users=50, categories=5, genres=10, titles=200,
+                  reviews=2000, comments=1000),
+    'medium': dict(users=500, categories=10, genres=30, titles=5000,
+                   reviews=50000, comments=25000),
+    'large': dict(users=5000, categories=20, genres=50, titles=50000,
+                  reviews=500000, comments=250000),
+}
+
+TITLES = '/api/v1/titles/'
+REVIEWS = TITLES + '{title}/reviews/'
+COMMENTS = REVIEWS + '{review}/comments/'
+
+# Имя, метод, адрес, пользователь, тело запроса. Подстановки
+# `{title}`, `{review}` и т.д. берутся из сгенерированных данных.
+ENDPOINTS = (
+    ('auth-signup', 'post', '/api/v1/auth/signup/', None,
+     {'username': 'bench_signup', 'email': 'bench_signup@yamdb.fake'}),
+    ('auth-resignup', 'post', '/api/v1/auth/signup/', None,
+     {'username': '{user}', 'email': '{email}'}),
+    ('auth-token', 'post', '/api/v1/auth/token/', None,
+     {'username': '{user}', 'confirmation_code': '{code}'}),
+    ('users-list', 'get', '/api/v1/users/', 'admin', None),
+    ('users-create', 'post', '/api/v1/users/', 'admin',
+     {'username': 'bench_new', 'email': 'bench_new@yamdb.fake'}),
+    ('users-detail', 'get', '/api/v1/users/{author}/', 'admin', None),
+    ('users-update', 'patch', '/api/v1/users/{author}/', 'admin',
+     {'bio': 'benchmark'}),
+    ('users-delete', 'delete', '/api/v1/users/{author}/', 'admin', None),
+    ('users-me', 'get', '/api/v1/users/me/', 'user', None),
+    ('users-me-update', 'patch', '/api/v1/users/me/', 'user',
+     {'bio': 'benchmark'}),
+    ('categories-list', 'get', '/api/v1/categories/', None, None),
+    ('categories-search', 'get', '/api/v1/categories/?search=1', None, None),
+    ('categories-create', 'post', '/api/v1/categories/', 'admin',
+     {'name': 'Бенчмарк', 'slug': 'benchmark'}),
+    ('categories-delete', 'delete', '/api/v1/categories/{category}/',
+     'admin', None),
+    ('genres-list', 'get', '/api/v1/genres/', None, None),
+    ('genres-search', 'get', '/api/v1/genres/?search=1', None, None),
+    ('genres-create', 'post', '/api/v1/genres/', 'admin',
+     {'name': 'Бенчмарк', 'slug': 'benchmark'}),
+    ('genres-delete', 'delete', '/api/v1/genres/{genre}/', 'admin', None),
+    ('titles-list', 'get', TITLES, None, None),
+    ('titles-filter', 'get', TITLES + '?genre={genre}&category={category}',
+     None, None),
+    ('titles-search', 'get', TITLES + '?search=война', None, None),
+    ('titles-facets', 'get', TITLES + '?facets=genre,category,year',
+     None, None),
+    ('titles-detail', 'get', TITLES + '{title}/', None, None),
+    ('titles-create', 'post', TITLES, 'admin',
+     {'name': 'Бенчмарк', 'year': 2000, 'genre': ['{genre}'],
+      'category': '{category}'}),
+    ('titles-update', 'patch', TITLES + '{title}/', 'admin',
+     {'name': 'Бенчмарк'}),
+    ('titles-delete', 'delete', TITLES + '{title}/', 'admin', None),
+    ('reviews-list', 'get', REVIEWS, None, None),
+    ('reviews-cursor', 'get', REVIEWS + '?pagination=cursor', None, None),
+    ('reviews-create', 'post', REVIEWS, 'user',
+     {'text': 'Бенчмарк', 'score': 7}),
+    ('reviews-detail', 'get', REVIEWS + '{review}/', None, None),
+    ('reviews-update', 'patch', REVIEWS + '{review}/', 'admin',
+     {'text': 'Бенчмарк'}),
+    ('reviews-delete', 'delete', REVIEWS + '{review}/', 'admin', None),
+    ('comments-list', 'get', COMMENTS, None, None),
+    ('comments-cursor', 'get', COMMENTS + '?pagination=cursor', None, None),
+    ('comments-create', 'post', COMMENTS, 'user', {'text': 'Бенчмарк'}),
+    ('comments-detail', 'get', COMMENTS + '{comment}/', None, None),
+    ('comments-update', 'patch', COMMENTS + '{comment}/', 'admin',
+     {'text': 'Бенчмарк'}),
+    ('comments-delete', 'delete', COMMENTS + '{comment}/', 'admin', None),
+    ('suggest', 'get', '/api/v1/suggest/?q=во', None, None),
+    ('export-titles', 'get', '/api/v1/export/titles/', 'admin', None),
+)
+
+# Разница меньше этой считается шумом и не проверяется (мс).
+NOISE_FLOOR_MS = 2.0
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+def fill(value, context):
+    if isinstance(value, str):
+        return value.format(**context)
+    if isinstance(value, list):
+        return [fill(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, context) for key, item in value.items()}
+    return value
+
+
+@contextmanager
+def benchmark_database(current_db=False):
+    """Временная тестовая база на время замеров."""
+    if current_db:
+        yield
+        return
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+class QueryCounter:
+    """Обёртка курсора, считающая SQL-запросы без точек сохранения."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(('SAVEPOINT', 'RELEASE', 'ROLLBACK')):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def find_regressions(scale, results, baseline, tolerance, latency=False):
+    """Ухудшения относительно базовой линии.
+
+    Задержка в миллисекундах зависит от машины, поэтому сравнивается
+    только при `latency`, когда базовая линия записана на этой же машине.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f'{scale}/{name}: запросов {previous["queries"]} -> '
+                f'{current["queries"]}'
+            )
+        # p99 на десятках повторов почти равен максимуму и слишком шумный.
+        for metric in ('p50', 'p95') if latency else ():
+            if (current[metric] > previous[metric] * (1 + tolerance)
+                    and current[metric] - previous[metric] > NOISE_FLOOR_MS):
+                regressions.append(
+                    f'{scale}/{name}: {metric} {previous[metric]:.2f} -> '
+                    f'{current[metric]:.2f} мс'
+                )
+        if current['bytes'] > previous['bytes'] * (1 + tolerance):
+            regressions.append(
+                f'{scale}/{name}: байт {previous["bytes"]} -> '
+                f'{current["bytes"]}'
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число SQL-запросов и размер ответа '
+            'для всех адресов API и сравнивает число запросов и размер '
+            'ответа с базовой линией.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', action='append', choices=SCALES,
+            help='Объём данных; можно указать несколько раз '
+                 '(по умолчанию small).'
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--endpoints', default='',
+            help='Регулярное выражение для отбора адресов по имени.'
+        )
+        parser.add_argument(
+            '--baseline', default=os.path.join(
+                settings.BASE_DIR, 'benchmarks', 'endpoints.json'
+            ),
+            help='JSON с базовой линией.'
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новую базовую линию.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Допустимое ухудшение задержки и размера ответа (доля).'
+        )
+        parser.add_argument(
+            '--check-latency', action='store_true',
+            help='Сравнивать и задержку; базовую линию для этого нужно '
+                 'записать на той же машине.'
+        )
+        parser.add_argument(
+            '--cache', action='store_true',
+            help='Не отключать кеш ответов API.'
+        )
+        parser.add_argument(
+            '--current-db', action='store_true',
+            help='Генерировать данные в текущей базе, а не во временной '
+                 'тестовой.'
+        )
+
+    def prepare(self, scale, seed):
+        call_command('generate_data', seed=seed, stdout=io.StringIO(),
+                     **SCALES[scale])
+        admin, _ = CustomUser.objects.get_or_create(
+            username='bench_admin', defaults={
+                'email': 'bench_admin@yamdb.fake', 'role': CustomUser.ADMIN,
+            }
+        )
+        user, _ = CustomUser.objects.get_or_create(
+            username='bench_user', defaults={
+                'email': 'bench_user@yamdb.fake',
+                'confirmation_code': 'benchmark',
+            }
+        )
+        title = Title.objects.order_by('-reviews_count', 'pk').first()
+        review = title.reviews.order_by('pk').first()
+        comment = Comment.objects.filter(review__title=title).order_by(
+            'review_id', 'pk'
+        ).first()
+        if comment is None:
+            comment = Comment.objects.create(
+                review=review, author=admin, text='Бенчмарк'
+            )
+        review = comment.review
+        context = {
+            'user': user.username,
+            'email': user.email,
+            'code': user.confirmation_code,
+            'author': review.author.username,
+            'category': title.category.slug if title.category else
+            Category.objects.first().slug,
+            'genre': Genre.objects.filter(title=title).first().slug,
+            'title': title.pk,
+            'review': review.pk,
+            'comment': comment.pk,
+        }
+        tokens = {
+            role: f'Bearer {token_for_user(account).access_token}'
+            for role, account in (('admin', admin), ('user', user))
+        }
+        return context, tokens
+
+    def call(self, client, method, path, data, token):
+        headers = {'HTTP_AUTHORIZATION': token} if token else {}
+        if data is not None:
+            response = getattr(client, method)(
+                path, json.dumps(data), content_type='application/json',
+                **headers
+            )
+        else:
+            response = getattr(client, method)(path, **headers)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{method.upper()} {path}: {response.status_code} '
+                f'{response.content[:200]!r}'
+            )
+        return size
+
+    def request(self, client, method, path, data, token):
+        """Запрос; изменения в базе откатываются."""
+        if method == 'get':
+            return self.call(client, method, path, data, token)
+        with transaction.atomic():
+            size = self.call(client, method, path, data, token)
+            transaction.set_rollback(True)
+        return size
+
+    def measure(self, endpoint, context, tokens, options):
+        name, method, path, user, data = endpoint
+        path, data = fill(path, context), fill(data, context)
+        token = tokens.get(user)
+        client = Client()
+        for _ in range(options['warmup']):
+            self.request(client, method, path, data, token)
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            size = self.request(client, method, path, data, token)
+        timings = []
+        for _ in range(options['iterations']):
+            started = time.perf_counter()
+            self.request(client, method, path, data, token)
+            timings.append((time.perf_counter() - started) * 1000)
+        if method != 'get':
+            # Сигналы откаченных записей успели изменить индексы в памяти.
+            suggest_index.clear()
+            bitmap_index.clear()
+        return {
+            'p50': round(percentile(timings, 50), 3),
+            'p95': round(percentile(timings, 95), 3),
+            'p99': round(percentile(timings, 99), 3),
+            'queries': queries.count,
+            'bytes': size,
+        }
+
+    def run_scale(self, scale, options):
+        pattern = re.compile(options['endpoints'])
+        context, tokens = self.prepare(scale, seed=0)
+        self.stdout.write(
+            f'\n{scale}: ' + ', '.join(
+                f'{name}={count}' for name, count in SCALES[scale].items()
+            )
+        )
+        self.stdout.write(
+            f'{"адрес":<20}{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}'
+            f'{"запросов":>10}{"байт":>10}'
+        )
+        results = {}
+        for endpoint in ENDPOINTS:
+            if not pattern.search(endpoint[0]):
+                continue
+            result = self.measure(endpoint, context, tokens, options)
+            results[endpoint[0]] = result
+            self.stdout.write(
+                f'{endpoint[0]:<20}{result["p50"]:>10.2f}'
+                f'{result["p95"]:>10.2f}{result["p99"]:>10.2f}'
+                f'{result["queries"]:>10}{result["bytes"]:>10}'
+            )
+        return results
+
+    def run(self, scales, options):
+        results = {}
+        for number, scale in enumerate(scales):
+            if number:
+                call_command('flush', interactive=False, verbosity=0)
+            results[scale] = self.run_scale(scale, options)
+        return results
+
+    def handle(self, *args, **options):
+        scales = options['scale'] or ['small']
+        if options['current_db'] and len(scales) > 1:
+            raise CommandError(
+                'С --current-db можно замерить только один объём данных.'
+            )
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['cache']:
+            overrides['RESPONSE_CACHE_TIMEOUT'] = 0
+        with override_settings(**overrides), \
+                benchmark_database(options['current_db']):
+            results = self.run(scales, options)
+
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        if options['save_baseline']:
+            for scale, scale_results in results.items():
+                baseline.setdefault(scale, {}).update(scale_results)
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(baseline, file, indent=2, sort_keys=True)
+                file.write('\n')
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия сохранена в {options["baseline"]}'
+            ))
+            return
+        regressions = []
+        for scale, scale_results in results.items():
+            regressions += find_regressions(
+                scale, scale_results, baseline.get(scale, {}),
+                options['tolerance'], options['check_latency']
+            )
+        if regressions:
+            raise CommandError(
+                'Ухудшение относительно базовой линии:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,208 @@
+import io
+import itertools
+import json
+import os
+import platform
+import timeit
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.core.management import BaseCommand, call_command
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.management.commands.benchmark_api import SCALES, benchmark_database
+from api.permissions import (IsAdmin, IsAdminOrModeratorOrAuthorOrReadOnly,
+                             IsAdminUserOrReadOnly)
+from api.serializers import (CustomUserSerializer, ReviewSerializer,
+                             TitleReadSerializer)
+from api.views import signup
+from reviews.models import CustomUser, Review, Title
+from reviews.validators import (validate_genre, validate_username,
+                                validate_year)
+
+INSTANCES = 100
+
+
+def make_request(method, user):
+    request = Request(getattr(APIRequestFactory(), method)('/'))
+    request.user = user
+    return request
+
+
+def rejected(validator, value):
+    """Вызов валидатора, который должен отклонить значение."""
+    def call():
+        try:
+            validator(value)
+        except (ValidationError, ValueError):
+            return
+        raise AssertionError(f'{validator.__name__}({value!r}) не отклонён')
+    return call
+
+
+def signup_call(data):
+    """Регистрация через представление, без middleware."""
+    def call():
+        request = APIRequestFactory().post('/', data(), format='json')
+        response = signup(request)
+        if response.status_code != 200:
+            raise AssertionError(f'signup: {response.status_code}')
+    return call
+
+
+def build_cases():
+    """Имя, число операций за вызов и сам вызов."""
+    titles = list(Title.objects.prefetch_related('genre')[:INSTANCES])
+    reviews = list(Review.objects.select_related('author')[:INSTANCES])
+    admin = CustomUser(username='bench_admin', role=CustomUser.ADMIN)
+    user = CustomUser(username='bench_user')
+    review = reviews[0]
+    anonymous_get = make_request('get', AnonymousUser())
+    admin_post = make_request('post', admin)
+    user_patch = make_request('patch', user)
+    user_data = {'username': 'bench_new', 'email': 'bench_new@yamdb.fake'}
+    object_permission = IsAdminOrModeratorOrAuthorOrReadOnly()
+    numbers = itertools.count()
+    existing = CustomUser.objects.order_by('pk').first()
+
+    def new_user():
+        number = next(numbers)
+        return {'username': f'bench_signup_{number}',
+                'email': f'bench_signup_{number}@yamdb.fake'}
+
+    return (
+        ('TitleReadSerializer.to_representation', len(titles),
+         lambda: TitleReadSerializer(titles, many=True).data),
+        ('ReviewSerializer.to_representation', len(reviews),
+         lambda: ReviewSerializer(reviews, many=True).data),
+        ('CustomUserSerializer.is_valid', 1,
+         lambda: CustomUserSerializer(data=user_data).is_valid()),
+        ('CustomUserSerializer.is_valid (me)', 1,
+         lambda: CustomUserSerializer(
+             data={'username': 'me', 'email': 'me@yamdb.fake'}
+         ).is_valid()),
+        ('IsAdmin', 1, lambda: IsAdmin().has_permission(admin_post, None)),
+        ('IsAdminUserOrReadOnly (GET)', 1,
+         lambda: IsAdminUserOrReadOnly().has_permission(anonymous_get, None)),
+        ('IsAdminUserOrReadOnly (POST)', 1,
+         lambda: IsAdminUserOrReadOnly().has_permission(admin_post, None)),
+        ('IsAdminOrModeratorOrAuthorOrReadOnly', 1,
+         lambda: object_permission.has_permission(user_patch, None)),
+        ('IsAdminOrModeratorOrAuthorOrReadOnly (object)', 1,
+         lambda: object_permission.has_object_permission(
+             user_patch, None, review
+         )),
+        ('validate_year', 1, lambda: validate_year(2000)),
+        ('validate_year (future)', 1, rejected(validate_year, 3000)),
+        ('validate_username', 1, lambda: validate_username('bench_user')),
+        ('validate_username (me)', 1, rejected(validate_username, 'me')),
+        ('validate_genre', 1, lambda: validate_genre('drama')),
+        ('signup (new user)', 1, signup_call(new_user)),
+        ('signup (repeat)', 1, signup_call(lambda: {
+            'username': existing.username, 'email': existing.email,
+        })),
+    )
+
+
+def measure(func, per_call, min_time, repeat):
+    """Лучшая скорость из `repeat` замеров и пик памяти на операцию."""
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    best = min(timer.repeat(repeat, number))
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'ops_per_sec': round(number * per_call / best, 1),
+        'bytes_per_op': round(peak / per_call),
+    }
+
+
+def last_entry(path):
+    if not os.path.exists(path):
+        return None
+    entry = None
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                entry = json.loads(line)
+    return entry
+
+
+class Command(BaseCommand):
+    help = ('Замеряет скорость сериализаторов, классов разрешений, '
+            'валидаторов и регистрации и дописывает результаты в файл '
+            'истории.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        parser.add_argument(
+            '--min-time', type=float, default=0.2,
+            help='Минимальная длительность одного замера, с.'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--history', default=os.path.join(
+                settings.BASE_DIR, 'benchmarks', 'units.jsonl'
+            ),
+            help='Файл истории замеров (JSON Lines).'
+        )
+        parser.add_argument(
+            '--label', default='',
+            help='Подпись замера в истории, например ветка или коммит.'
+        )
+        parser.add_argument(
+            '--current-db', action='store_true',
+            help='Генерировать данные в текущей базе, а не во временной '
+                 'тестовой.'
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['current_db']):
+            call_command('generate_data', stdout=io.StringIO(),
+                         **SCALES[options['scale']])
+            results = {
+                name: measure(
+                    func, per_call, options['min_time'], options['repeat']
+                )
+                for name, per_call, func in build_cases()
+            }
+
+        previous = last_entry(options['history'])
+        previous = previous['results'] if previous else {}
+        self.stdout.write(
+            f'{"операция":<48}{"оп/с":>14}{"байт/оп":>10}{"изменение":>11}'
+        )
+        for name, result in results.items():
+            change = ''
+            if name in previous:
+                change = '{:+.1f}%'.format(
+                    (result['ops_per_sec'] / previous[name]['ops_per_sec']
+                     - 1) * 100
+                )
+            self.stdout.write(
+                f'{name:<48}{result["ops_per_sec"]:>14,.0f}'
+                f'{result["bytes_per_op"]:>10}{change:>11}'
+            )
+
+        os.makedirs(os.path.dirname(options['history']), exist_ok=True)
+        with open(options['history'], 'a', encoding='utf-8') as file:
+            file.write(json.dumps({
+                'time': timezone.now().isoformat(timespec='seconds'),
+                'label': options['label'],
+                'python': platform.python_version(),
+                'scale': options['scale'],
+                'results': results,
+            }, ensure_ascii=False) + '\n')
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты добавлены в {options["history"]}'
+        ))
@@ -0,0 +1,258 @@
+"""Метрики API в текстовом формате Prometheus.
+
+Каждый процесс копит значения в памяти. Если задан `METRICS_DIR`,
+процесс раз в `METRICS_FLUSH_INTERVAL` секунд записывает свои значения
+в отдельный файл этой папки, а `/metrics` суммирует файлы всех
+процессов — так метрики воркеров gunicorn видны из любого из них.
+Файл завершившегося процесса забирает тот процесс, который собирает
+метрики: прибавляет значения к своим и удаляет файл. Счётчики не
+убывают, а файлов в папке не больше, чем живых процессов. Папка должна
+быть своей у каждой машины: живость процесса проверяется по pid.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+METRICS = {
+    'yamdb_http_requests_total': (
+        'counter', 'Запросы к API по представлениям.'
+    ),
+    'yamdb_http_errors_total': (
+        'counter', 'Ответы с ошибкой сервера (5xx).'
+    ),
+    'yamdb_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'
+    ),
+    'yamdb_db_queries_per_request': (
+        'histogram', 'SQL-запросов на один запрос к API.'
+    ),
+    'yamdb_db_duration_seconds': (
+        'histogram', 'Время SQL-запросов одного запроса к API.'
+    ),
+    'yamdb_response_cache_total': (
+        'counter', 'Обращения к кешу ответов API по результату.'
+    ),
+    'yamdb_response_cache_hit_ratio': (
+        'gauge', 'Доля ответов API, отданных из кеша.'
+    ),
+}
+
+
+def escape(value):
+    return (str(value).replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def pid_alive(pid):
+    if os.name != 'posix':
+        # os.kill в Windows завершает процесс, а не проверяет его.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def file_pid(filename):
+    """pid из имени файла `<pid>-<id>.json` или None."""
+    pid, _, rest = filename.partition('-')
+    if not pid.isdigit() or not rest.endswith('.json'):
+        return None
+    return int(pid)
+
+
+def read_rows(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return []
+
+
+def add_rows(values, rows):
+    for name, labels, value in rows:
+        key = (name, tuple(tuple(label) for label in labels))
+        values[key] = values.get(key, 0) + value
+
+
+def format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Registry:
+    """Значения метрик процесса: (имя, метки) -> число."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.values = {}
+        self.filename = None
+        self.flushed = 0.0
+
+    def check_pid(self):
+        # После fork воркер не должен досчитывать значения мастера.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.values = {}
+            self.filename = f'{self.pid}-{uuid.uuid4().hex[:8]}.json'
+            self.flushed = 0.0
+
+    def clear(self):
+        with self.lock:
+            self.pid = None
+            self.check_pid()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets):
+        # Пустые бакеты тоже выводятся: их ждёт histogram_quantile.
+        for bound in buckets:
+            self.inc(f'{name}_bucket', {**labels, 'le': bound},
+                     int(value <= bound))
+        self.inc(f'{name}_bucket', {**labels, 'le': '+Inf'})
+        self.inc(f'{name}_sum', labels, value)
+        self.inc(f'{name}_count', labels)
+
+    def record_request(self, view, method, status, duration,
+                       queries=None, sql_duration=None):
+        with self.lock:
+            self.check_pid()
+            labels = {'view': view}
+            self.inc('yamdb_http_requests_total',
+                     {**labels, 'method': method, 'status': status})
+            if status >= 500:
+                self.inc('yamdb_http_errors_total', labels)
+            self.observe('yamdb_http_request_duration_seconds', labels,
+                         duration, LATENCY_BUCKETS)
+            if queries is not None:
+                self.observe('yamdb_db_queries_per_request', labels,
+                             queries, QUERY_BUCKETS)
+                self.observe('yamdb_db_duration_seconds', labels,
+                             sql_duration, LATENCY_BUCKETS)
+        self.maybe_flush()
+
+    def record_cache(self, result):
+        with self.lock:
+            self.check_pid()
+            self.inc('yamdb_response_cache_total', {'result': result})
+
+    def maybe_flush(self, force=False):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        with self.lock:
+            self.check_pid()
+            self.flushed = now
+            rows = [
+                [name, list(labels), value]
+                for (name, labels), value in self.values.items()
+            ]
+            filename = self.filename
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, filename)
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(rows, file)
+        os.replace(f'{path}.tmp', path)
+
+    def absorb_dead(self, directory):
+        """Забирает значения из файлов завершившихся процессов."""
+        claimed = []
+        for filename in os.listdir(directory):
+            pid = file_pid(filename)
+            if pid is None or pid == os.getpid() or pid_alive(pid):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                # Переименование атомарно: файл заберёт один процесс.
+                os.replace(path, f'{path}.{os.getpid()}.absorbed')
+            except OSError:
+                continue
+            claimed.append(f'{path}.{os.getpid()}.absorbed')
+        if not claimed:
+            return
+        with self.lock:
+            self.check_pid()
+            for path in claimed:
+                add_rows(self.values, read_rows(path))
+        self.maybe_flush(force=True)
+        for path in claimed:
+            os.remove(path)
+
+    def collect(self):
+        """Сумма значений всех процессов."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            with self.lock:
+                self.check_pid()
+                return dict(self.values)
+        self.maybe_flush(force=True)
+        self.absorb_dead(directory)
+        values = {}
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                add_rows(values, read_rows(os.path.join(directory, filename)))
+        return values
+
+    def render(self):
+        values = self.collect()
+        hits = sum(
+            value for (name, labels), value in values.items()
+            if name == 'yamdb_response_cache_total'
+            and dict(labels)['result'] != 'miss'
+        )
+        lookups = sum(
+            value for (name, _), value in values.items()
+            if name == 'yamdb_response_cache_total'
+        )
+        if lookups:
+            values[('yamdb_response_cache_hit_ratio', ())] = hits / lookups
+        lines = []
+        for metric, (kind, help_text) in METRICS.items():
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            names = (
+                (f'{metric}_bucket', f'{metric}_sum', f'{metric}_count')
+                if kind == 'histogram' else (metric,)
+            )
+            for (name, labels), value in sorted(
+                values.items(), key=sample_order
+            ):
+                if name not in names:
+                    continue
+                label_text = ','.join(
+                    f'{key}="{escape(label)}"' for key, label in labels
+                )
+                if label_text:
+                    name = f'{name}{{{label_text}}}'
+                lines.append(f'{name} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def sample_order(item):
+    """Бакеты гистограммы по возрастанию границы, `+Inf` последним."""
+    (name, labels), _ = item
+    bound = dict(labels).get('le')
+    other = tuple(label for label in labels if label[0] != 'le')
+    if bound is None:
+        return name, other, 0
+    return name, other, float('inf') if bound == '+Inf' else float(bound)
+
+
+registry = Registry()
@@ -0,0 +1,265 @@
+"""Учёт SQL-запросов и метрики каждого запроса к API.
+
+Обёртка курсора считает запросы, их суммарное время и повторы одного и
+того же SQL (признак N+1). Итоги отдаются в заголовках `X-DB-Queries`,
+`X-DB-Duplicates` и `Server-Timing` (при DEBUG, администраторам или
+по настройке `QUERY_STATS_HEADERS`) и накапливаются по представлениям
+в скользящих окнах последних запросов — отдельно в каждом процессе.
+Время, статусы и число запросов к базе попадают и в метрики Prometheus.
+Отдельные запросы можно профилировать: по флагу администратора или
+случайной выборкой, и трассировать (см. api.tracing).
+"""
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import APIException
+
+from api import tracing
+from api.authentication import ClaimsJWTAuthentication
+from api.metrics import registry
+from api.profiling import PROFILERS, save_profile
+from reviews.models import RequestProfile
+
+
+def view_name(request):
+    """`TitleViewSet.list` для вьюсетов, имя функции для остальных."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view = match.func
+    cls = getattr(view, 'cls', None)
+    actions = getattr(view, 'actions', None)
+    if cls is not None and actions:
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f'{cls.__name__}.{action}'
+    if cls is not None:
+        return cls.__name__
+    return getattr(view, '__name__', match.view_name)
+
+
+class QueryCounter:
+    """Обёртка курсора: число, время и повторы SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.statements)
+
+
+class QueryStats:
+    """Скользящие окна последних запросов по представлениям."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def clear(self):
+        with self.lock:
+            self.views = {}
+
+    def record(self, view, queries, duplicates, sql_ms, total_ms):
+        with self.lock:
+            window = self.views.get(view)
+            if window is None:
+                window = self.views[view] = deque(
+                    maxlen=settings.QUERY_STATS_WINDOW
+                )
+            window.append((queries, duplicates, sql_ms, total_ms))
+
+    def summary(self):
+        with self.lock:
+            windows = {view: list(window) for view, window in
+                       self.views.items()}
+        results = []
+        for view, samples in windows.items():
+            queries, duplicates, sql_ms, total_ms = zip(*samples)
+            requests = len(samples)
+            results.append({
+                'view': view,
+                'requests': requests,
+                'queries_avg': round(sum(queries) / requests, 2),
+                'queries_max': max(queries),
+                'duplicates_avg': round(sum(duplicates) / requests, 2),
+                'sql_ms_avg': round(sum(sql_ms) / requests, 3),
+                'total_ms_avg': round(sum(total_ms) / requests, 3),
+                'total_ms_max': round(max(total_ms), 3),
+            })
+        return sorted(
+            results, key=lambda row: row['queries_avg'], reverse=True
+        )
+
+
+stats = QueryStats()
+
+
+class QueryStatsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_STATS_ENABLED:
+            return self.get_response(request)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        sql_ms = counter.duration * 1000
+        if query_headers_allowed(request):
+            response['X-DB-Queries'] = counter.count
+            response['X-DB-Duplicates'] = counter.duplicates
+            response['Server-Timing'] = (
+                f'db;dur={sql_ms:.2f};desc="{counter.count} queries", '
+                f'total;dur={total_ms:.2f}'
+            )
+        request.query_counter = counter
+        view = view_name(request)
+        if view is not None:
+            stats.record(
+                view, counter.count, counter.duplicates, sql_ms, total_ms
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """Время, статус и SQL-запросы каждого запроса в метриках."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        counter = getattr(request, 'query_counter', None)
+        registry.record_request(
+            view_name(request) or 'unmatched', request.method,
+            response.status_code, time.perf_counter() - started,
+            counter.count if counter else None,
+            counter.duration if counter else None,
+        )
+        return response
+
+
+def is_admin_request(request):
+    """Запрос с JWT-токеном администратора."""
+    try:
+        authenticated = ClaimsJWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return authenticated is not None and authenticated[0].is_admin
+
+
+def query_headers_allowed(request):
+    allowed = settings.QUERY_STATS_HEADERS
+    if allowed is None:
+        return settings.DEBUG or is_admin_request(request)
+    return allowed
+
+
+class ProfilerMiddleware:
+    """Профилирует запрос по флагу администратора или 1 из N запросов.
+
+    Флаг — заголовок `X-Profile` или параметр `?profile=`; значение
+    `pstats` или `collapsed` выбирает профилировщик.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILER_ENABLED:
+            return self.get_response(request)
+        requested = (
+            request.META.get('HTTP_X_PROFILE')
+            or request.GET.get('profile')
+        )
+        sampled = False
+        if requested:
+            if not is_admin_request(request):
+                return self.get_response(request)
+        elif (settings.PROFILER_SAMPLE_RATE
+              and random.randrange(settings.PROFILER_SAMPLE_RATE) == 0):
+            sampled = True
+        else:
+            return self.get_response(request)
+        profiler = PROFILERS.get(
+            requested, PROFILERS[settings.PROFILER_FORMAT]
+        )()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        view = view_name(request) or 'unmatched'
+        counter = getattr(request, 'query_counter', None)
+        profile = RequestProfile.objects.create(
+            view=view,
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            status=response.status_code,
+            duration_ms=duration_ms,
+            queries=counter.count if counter else None,
+            sampled=sampled,
+            filename=save_profile(profiler, view),
+        )
+        if not sampled:
+            response['X-Profile-Id'] = profile.pk
+        return response
+
+
+class TracingMiddleware:
+    """Корневой спан запроса и спаны SQL-запросов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trace = None
+        if settings.TRACING_ENABLED:
+            trace = tracing.start_trace(request)
+        if trace is None:
+            return self.get_response(request)
+        with tracing.activate(trace), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(
+                    tracing.SQLSpans(trace, connection.vendor)
+                ))
+            with trace.span(
+                request.method, kind=tracing.SPAN_KIND_SERVER, **{
+                    'http.method': request.method,
+                    'http.target': request.get_full_path(),
+                }
+            ) as root:
+                response = self.get_response(request)
+                root['name'] = view_name(request) or request.method
+                root['attributes']['http.status_code'] = (
+                    response.status_code
+                )
+        tracing.write_trace(trace)
+        response['X-Trace-Id'] = trace.trace_id
+        return response
@@ -1,8 +1,104 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from api import cache, tracing
+from api.metrics import registry as metrics
+from api.reference import reference_data
 
-class ModelMixinSet(CreateModelMixin, ListModelMixin,
+
+class TracingMixin:
+    """Спаны этапов DRF, если запрос трассируется.
+
+    Методы подменяются у экземпляра представления, поэтому спан
+    охватывает и переопределения в наследниках, например
+    `TitleViewSet.filter_queryset`.
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        if tracing.current_trace() is not None:
+            tracing.instrument_view(self)
+        return super().initialize_request(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        renderer = getattr(response, 'accepted_renderer', None)
+        if tracing.current_trace() is not None and renderer is not None:
+            renderer.render = tracing.traced('renderer', renderer.render)
+        return response
+
+
+class ModelMixinSet(TracingMixin, CreateModelMixin, ListModelMixin,
                     DestroyModelMixin, GenericViewSet):
     pass
+
+
+class ReferenceMixinSet(ModelMixinSet):
+    """Справочник, список которого отдаётся из снимка в памяти."""
+
+    def list(self, request, *args, **kwargs):
+        objects = reference_data(self.queryset.model).get().search(
+            request.query_params.get('search', '')
+        )
+        page = self.paginate_queryset(objects)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class CachedResponseMixin:
+    """Кеширует ответы на list и retrieve с тегами для инвалидации.
+
+    Ответы снабжаются ETag и Last-Modified; условный запрос с
+    совпавшими валидаторами получает 304 без обращения к базе. Если
+    кеш ответов выключен, запросы обрабатываются как обычно.
+    """
+
+    cache_list_tags = ()
+    cache_detail_tags = ()
+
+    def get_cache_tags(self):
+        if self.action == 'list':
+            tags = self.cache_list_tags
+        else:
+            tags = self.cache_detail_tags
+        return [tag.format(**self.kwargs) for tag in tags]
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not cache.is_enabled():
+            return handler(request, *args, **kwargs)
+        key = cache.make_key(request)
+        versions = cache.tag_versions(self.get_cache_tags())
+        etag, last_modified = cache.make_validators(key, versions)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            metrics.record_cache('not_modified')
+            return response
+        data = cache.get_response_data(key, versions)
+        if data is not None:
+            metrics.record_cache('hit')
+            response = Response(data)
+        else:
+            metrics.record_cache('miss')
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cache.set_response_data(key, response.data, versions)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
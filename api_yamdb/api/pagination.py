@@ -0,0 +1,39 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Курсорная пагинация по дате публикации."""
+
+    ordering = ('-pub_date', '-id')
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Постраничная пагинация с переключением на курсорную.
+
+    Курсорный режим включается параметром `?pagination=cursor` и
+    сохраняется в ссылках `next`/`previous` через параметр `cursor`.
+    """
+
+    mode_query_param = 'pagination'
+    cursor_pagination_class = PubDateCursorPagination
+
+    def use_cursor(self, request):
+        cursor = self.cursor_pagination_class
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or cursor.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
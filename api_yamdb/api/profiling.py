@@ -0,0 +1,115 @@
+"""Профилирование отдельных запросов к API.
+
+`pstats` — детерминированный профиль cProfile, открывается модулем
+pstats или snakeviz. `collapsed` — семплирующий профиль: отдельный
+поток раз в `PROFILER_INTERVAL` секунд снимает стек потока запроса, а
+результат записывается в формате collapsed stacks для flamegraph.pl и
+speedscope. Старые профили вместе с файлами удаляет периодическая
+задача `prune_profiles`.
+"""
+import cProfile
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from reviews.models import RequestProfile
+
+
+class DeterministicProfiler:
+    extension = 'prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    extension = 'collapsed'
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.thread_id = None
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self.sampler.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.sampler.join()
+
+    def sample(self):
+        interval = settings.PROFILER_INTERVAL
+        while not self.stopped.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} ({code.co_filename}:{frame.f_lineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+PROFILERS = {
+    'pstats': DeterministicProfiler,
+    'collapsed': SamplingProfiler,
+}
+
+
+def profile_filename(view, extension):
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    return f'{stamp}-{view}-{uuid.uuid4().hex[:8]}.{extension}'
+
+
+def save_profile(profiler, view):
+    os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+    filename = profile_filename(view, profiler.extension)
+    profiler.save(os.path.join(settings.PROFILER_DIR, filename))
+    return filename
+
+
+def prune_profiles():
+    """Удаляет старые профили вместе с файлами.
+
+    Остаются последние `PROFILER_MAX_PROFILES` профилей не старше
+    `PROFILER_MAX_AGE` секунд. Возвращает число удалённых.
+    """
+    profiles = RequestProfile.objects.order_by('-created', '-pk')
+    cutoff = timezone.now() - timedelta(seconds=settings.PROFILER_MAX_AGE)
+    stale = dict(
+        profiles.filter(created__lt=cutoff).values_list('pk', 'filename')
+    )
+    stale.update(profiles.values_list(
+        'pk', 'filename'
+    )[settings.PROFILER_MAX_PROFILES:])
+    RequestProfile.objects.filter(pk__in=list(stale)).delete()
+    for filename in stale.values():
+        try:
+            os.remove(os.path.join(settings.PROFILER_DIR, filename))
+        except FileNotFoundError:
+            pass
+    return len(stale)
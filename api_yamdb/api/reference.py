@@ -0,0 +1,119 @@
+"""Снимки справочников `Category` и `Genre` в памяти процесса.
+
+Снимок неизменяем и помечен версией. Текущая версия хранится в кеше
+Django и меняется при каждой записи в справочник, поэтому процесс
+замечает устаревший снимок одним обращением к кешу и перечитывает
+таблицу. Чтобы версия была общей для воркеров gunicorn, в `CACHES`
+должен быть настроен разделяемый бэкенд. Снимок старше
+`REFERENCE_SNAPSHOT_MAX_AGE` секунд перечитывается в любом случае: так
+потерянный сигнал или вытесненная из кеша версия не оставят его
+устаревшим навсегда.
+"""
+import re
+import threading
+import time
+import uuid
+from types import MappingProxyType
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+from reviews.models import Category, Genre
+
+SEARCH_SPLIT_RE = re.compile(r'[\s,]+')
+
+
+class ReferenceSnapshot:
+    """Неизменяемый снимок таблицы-справочника."""
+
+    def __init__(self, objects, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.objects = tuple(objects)
+        self.by_slug = MappingProxyType(
+            {obj.slug: obj for obj in self.objects}
+        )
+        self.by_id = MappingProxyType({obj.pk: obj for obj in self.objects})
+
+    def search(self, query):
+        """Аналог `SearchFilter` по полю `name`."""
+        terms = [term.lower() for term in SEARCH_SPLIT_RE.split(query)
+                 if term]
+        return [
+            obj for obj in self.objects
+            if all(term in obj.name.lower() for term in terms)
+        ]
+
+
+class ReferenceData:
+    """Доступ к актуальному снимку одного справочника."""
+
+    def __init__(self, model):
+        self.model = model
+        self.version_key = f'reference-version:{model._meta.label_lower}'
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(self.version_key, version, None):
+                version = cache.get(self.version_key) or version
+        return version
+
+    @staticmethod
+    def is_current(snapshot, version):
+        return (
+            snapshot is not None and snapshot.version == version
+            and time.monotonic() - snapshot.loaded_at
+            <= settings.REFERENCE_SNAPSHOT_MAX_AGE
+        )
+
+    def get(self):
+        version = self.current_version()
+        snapshot = self.snapshot
+        if not self.is_current(snapshot, version):
+            with self.lock:
+                snapshot = self.snapshot
+                if not self.is_current(snapshot, version):
+                    snapshot = ReferenceSnapshot(
+                        self.model.objects.all(), version
+                    )
+                    self.snapshot = snapshot
+        return snapshot
+
+    def bump(self):
+        cache.set(self.version_key, uuid.uuid4().hex, None)
+
+
+REFERENCES = {model: ReferenceData(model) for model in (Category, Genre)}
+
+
+def reference_data(model):
+    return REFERENCES[model]
+
+
+def reference_changed(sender, **kwargs):
+    reference = REFERENCES[sender]
+    reference.bump()
+    # Повторно после коммита: другие процессы могли успеть перечитать
+    # таблицу до того, как запись стала им видна.
+    transaction.on_commit(reference.bump)
+
+
+def database_reset(**kwargs):
+    for reference in REFERENCES.values():
+        reference.bump()
+
+
+def connect_signals():
+    for model in REFERENCES:
+        post_save.connect(reference_changed, sender=model)
+        post_delete.connect(reference_changed, sender=model)
+    post_migrate.connect(
+        database_reset, sender=apps.get_app_config('reviews')
+    )
@@ -1,15 +1,30 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
+from api.reference import reference_data
 from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
 from reviews.validators import validate_username
 
 User = get_user_model()
 
 
+class ReferenceSlugRelatedField(SlugRelatedField):
+    """Разрешает slug справочника по снимку в памяти, без запроса."""
+
+    def to_internal_value(self, data):
+        snapshot = reference_data(self.get_queryset().model).get()
+        try:
+            obj = snapshot.by_slug.get(data)
+        except TypeError:
+            self.fail('invalid')
+        if obj is None:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=str(data))
+        return obj
+
+
 class CustomUserSerializer(serializers.ModelSerializer):
     username = serializers.CharField(
         required=True,
@@ -103,46 +118,77 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
+def title_genre_ids(titles):
+    """id жанров произведений одним запросом к таблице связей."""
+    genre_ids = {title.pk: set() for title in titles}
+    for title_id, genre_id in Title.genre.through.objects.filter(
+        title_id__in=list(genre_ids)
+    ).values_list('title_id', 'genre_id'):
+        genre_ids[title_id].add(genre_id)
+    return genre_ids
+
+
+def reference_snapshot(context, model):
+    """Снимок справочника, один на запрос (см. `get_serializer_context`)."""
+    snapshots = context.setdefault('snapshots', {})
+    if model not in snapshots:
+        snapshots[model] = reference_data(model).get()
+    return snapshots[model]
+
+
+class TitleListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        titles = list(data)
+        self.context['genre_ids'] = title_genre_ids(titles)
+        return super().to_representation(titles)
+
+
 class TitleReadSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
-    genre = GenreSerializer(
-        read_only=True,
-        many=True
-    )
-    rating = serializers.SerializerMethodField()
+    """Категория и жанры берутся из снимков справочников."""
+
+    category = serializers.SerializerMethodField()
+    genre = serializers.SerializerMethodField()
 
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'rating', 'description', 'genre',
+                  'category')
+        read_only_fields = ('rating',)
         model = Title
+        list_serializer_class = TitleListSerializer
 
-    def get_rating(self, obj):
-        rating = obj.reviews.aggregate(rating=Avg('score'))
-        if rating is not None:
-            return rating['rating']
-        rating = 0
-        return rating
+    def get_category(self, obj):
+        category = reference_snapshot(self.context, Category).by_id.get(
+            obj.category_id
+        )
+        if category is None:
+            return None
+        return CategorySerializer(category).data
+
+    def get_genre(self, obj):
+        genre_ids = self.context.get('genre_ids', {}).get(obj.pk)
+        if genre_ids is None:
+            genre_ids = title_genre_ids([obj])[obj.pk]
+        return GenreSerializer([
+            genre for genre in reference_snapshot(self.context, Genre).objects
+            if genre.pk in genre_ids
+        ], many=True).data
 
 
 class TitleWriteSerializer(serializers.ModelSerializer):
-    category = serializers.SlugRelatedField(
+    category = ReferenceSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
-    genre = serializers.SlugRelatedField(
+    genre = ReferenceSlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
         many=True,
         required=True
     )
-    rating = serializers.SerializerMethodField()
 
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'rating', 'description', 'genre',
+                  'category')
+        read_only_fields = ('rating',)
         model = Title
-
-    def get_rating(self, obj):
-        rating = obj.reviews.aggregate(rating=Avg('score'))
-        if rating is not None:
-            return rating['rating']
-        rating = 0
-        return rating
@@ -0,0 +1,175 @@
+"""Индекс префиксов для подсказок при наборе запроса.
+
+Названия произведений, жанров и категорий хранятся в отсортированном
+списке ключей; поиск по префиксу — это `bisect` и проход вперёд, без
+обращения к базе. Индекс строится при первом запросе, обновляется
+сигналами моделей и раз в `SUGGEST_INDEX_TTL` секунд перестраивается,
+чтобы подхватить изменения, сделанные другими процессами. Перестройка
+идёт в фоновом потоке, а запросы тем временем обслуживает прежний
+индекс; изменения, пришедшие по сигналам во время перестройки,
+применяются к новому индексу после подмены.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+
+from reviews.models import Category, Genre, Title
+
+WORD_RE = re.compile(r'\w+')
+
+SOURCES = {
+    'titles': (Title, 'id'),
+    'genres': (Genre, 'slug'),
+    'categories': (Category, 'slug'),
+}
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall(text.lower().replace('ё', 'е')))
+
+
+class PrefixIndex:
+    """Отсортированный массив ключей с поиском по префиксу."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = []
+        self.items = {}
+        self.built_at = None
+        # Изменения по сигналам во время фоновой перестройки; None —
+        # перестройка не идёт.
+        self.changes = None
+
+    def is_stale(self):
+        ttl = getattr(settings, 'SUGGEST_INDEX_TTL', 60)
+        return self.built_at is None or time.monotonic() - self.built_at > ttl
+
+    def clear(self):
+        with self.lock:
+            self.keys, self.items = [], {}
+            self.built_at = None
+            self.changes = None
+
+    def build(self):
+        keys, items = [], {}
+        for kind, (model, lookup) in SOURCES.items():
+            for pk, name, value in model.objects.values_list(
+                'pk', 'name', lookup
+            ).iterator():
+                item = {'type': kind, lookup: value, 'name': name}
+                items[(kind, pk)] = item
+                keys.extend(self.make_keys(kind, pk, name))
+        keys.sort()
+        with self.lock:
+            self.keys, self.items = keys, items
+            self.built_at = time.monotonic()
+            changes, self.changes = self.changes or [], None
+            for change in changes:
+                change()
+
+    def rebuild_in_background(self):
+        """Запускает перестройку, если она ещё не идёт."""
+        with self.lock:
+            if self.changes is not None:
+                return
+            self.changes = []
+        threading.Thread(target=self.background_build, daemon=True).start()
+
+    def background_build(self):
+        try:
+            self.build()
+        finally:
+            with self.lock:
+                # После ошибки следующий запрос попробует ещё раз.
+                self.changes = None
+            # У потока своё соединение с базой.
+            connection.close()
+
+    @staticmethod
+    def make_keys(kind, pk, name):
+        """Ключ на каждое слово названия: «мир» найдёт «Война и мир»."""
+        words = normalize(name).split()
+        return [
+            (' '.join(words[start:]), kind, pk)
+            for start in range(len(words))
+        ]
+
+    def add(self, kind, obj):
+        with self.lock:
+            if self.built_at is None:
+                return
+            if self.changes is not None:
+                self.changes.append(lambda: self._add(kind, obj))
+            self._add(kind, obj)
+
+    def _add(self, kind, obj):
+        lookup = SOURCES[kind][1]
+        self._remove(kind, obj.pk)
+        self.items[(kind, obj.pk)] = {
+            'type': kind, lookup: getattr(obj, lookup), 'name': obj.name
+        }
+        for key in self.make_keys(kind, obj.pk, obj.name):
+            insort(self.keys, key)
+
+    def remove(self, kind, pk):
+        with self.lock:
+            if self.built_at is None:
+                return
+            if self.changes is not None:
+                self.changes.append(lambda: self._remove(kind, pk))
+            self._remove(kind, pk)
+
+    def _remove(self, kind, pk):
+        item = self.items.pop((kind, pk), None)
+        if item is None:
+            return
+        for key in self.make_keys(kind, pk, item['name']):
+            position = bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def search(self, prefix, limit, kinds=None):
+        if self.built_at is None:
+            self.build()
+        elif self.is_stale():
+            self.rebuild_in_background()
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found, results = set(), []
+        with self.lock:
+            position = bisect_left(self.keys, (prefix,))
+            while position < len(self.keys) and len(results) < limit:
+                key, kind, pk = self.keys[position]
+                if not key.startswith(prefix):
+                    break
+                position += 1
+                if (kinds and kind not in kinds) or (kind, pk) in found:
+                    continue
+                found.add((kind, pk))
+                results.append(self.items[(kind, pk)])
+        return results
+
+
+index = PrefixIndex()
+
+MODEL_KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+
+
+def index_object(sender, instance, **kwargs):
+    index.add(MODEL_KINDS[sender], instance)
+
+
+def unindex_object(sender, instance, **kwargs):
+    index.remove(MODEL_KINDS[sender], instance.pk)
+
+
+def connect_signals():
+    for model in MODEL_KINDS:
+        post_save.connect(index_object, sender=model)
+        post_delete.connect(unindex_object, sender=model)
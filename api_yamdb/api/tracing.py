@@ -0,0 +1,219 @@
+"""Трассировка запросов к API со спанами этапов DRF.
+
+Корневой спан открывает TracingMiddleware; внутри него спаны получают
+аутентификация, проверка разрешений, filter_queryset,
+paginate_queryset, to_representation сериализатора, рендерер и каждый
+SQL-запрос. Готовая трасса дописывается строкой в JSON Lines файл
+`TRACING_FILE` в формате OTLP/JSON (ExportTraceServiceRequest), который
+принимают коллекторы OpenTelemetry и otel-cli.
+
+Этапы DRF размечает `TracingMixin` из api.mixins у представлений,
+которые его наследуют.
+
+Трассируется доля `TRACING_SAMPLE_RATE` запросов. Заголовок W3C
+`traceparent` продолжает трассу вызывающего сервиса, но его флаг
+sampled учитывается только для адресов из `TRACING_TRUSTED_NETWORKS`:
+иначе любой клиент мог бы включить трассировку каждого своего запроса.
+"""
+import functools
+import ipaddress
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+# Методы представления, вызовы которых становятся спанами.
+VIEW_STAGES = {
+    'perform_authentication': 'authentication',
+    'check_permissions': 'permissions',
+    'check_object_permissions': 'object_permissions',
+    'filter_queryset': 'filter_queryset',
+    'paginate_queryset': 'paginate_queryset',
+}
+
+local = threading.local()
+write_lock = threading.Lock()
+
+
+def random_id(size):
+    return f'{random.getrandbits(size * 8):0{size * 2}x}'
+
+
+def attribute_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Trace:
+    def __init__(self, trace_id=None, parent_id=None):
+        self.trace_id = trace_id or random_id(16)
+        self.root_parent_id = parent_id
+        self.spans = []
+        self.stack = []
+
+    @contextmanager
+    def span(self, name, kind=SPAN_KIND_INTERNAL, **attributes):
+        parent_id = (
+            self.stack[-1]['spanId'] if self.stack else self.root_parent_id
+        )
+        span = {
+            'traceId': self.trace_id,
+            'spanId': random_id(8),
+            'name': name,
+            'kind': kind,
+            'startTimeUnixNano': str(time.time_ns()),
+            'attributes': attributes,
+        }
+        if parent_id:
+            span['parentSpanId'] = parent_id
+        self.stack.append(span)
+        try:
+            yield span
+        except Exception as error:
+            span['status'] = {'code': STATUS_ERROR, 'message': repr(error)}
+            raise
+        finally:
+            self.stack.pop()
+            span['endTimeUnixNano'] = str(time.time_ns())
+            span['attributes'] = [
+                {'key': key, 'value': attribute_value(value)}
+                for key, value in span['attributes'].items()
+            ]
+            self.spans.append(span)
+
+    def export(self):
+        """Строка OTLP/JSON с трассой."""
+        return json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [{
+                'key': 'service.name',
+                'value': {'stringValue': settings.TRACING_SERVICE_NAME},
+            }]},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': self.spans,
+            }],
+        }]}, ensure_ascii=False)
+
+
+def current_trace():
+    return getattr(local, 'trace', None)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Спан внутри текущей трассы; без трассы ничего не делает."""
+    trace = current_trace()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attributes) as new_span:
+        yield new_span
+
+
+def traced(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def parse_traceparent(header):
+    """(trace_id, parent_id, sampled) из заголовка W3C traceparent."""
+    parts = header.split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def is_trusted(request):
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in settings.TRACING_TRUSTED_NETWORKS
+    )
+
+
+def start_trace(request):
+    """Новая трасса для запроса или None, если он не попал в выборку."""
+    parent = parse_traceparent(request.META.get('HTTP_TRACEPARENT', ''))
+    if parent is None:
+        trace_id = parent_id = None
+    else:
+        trace_id, parent_id, sampled = parent
+        if is_trusted(request):
+            return Trace(trace_id, parent_id) if sampled else None
+    if random.random() < settings.TRACING_SAMPLE_RATE:
+        return Trace(trace_id, parent_id)
+    return None
+
+
+@contextmanager
+def activate(trace):
+    local.trace = trace
+    try:
+        yield trace
+    finally:
+        local.trace = None
+
+
+def write_trace(trace):
+    path = settings.TRACING_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    line = trace.export() + '\n'
+    with write_lock, open(path, 'a', encoding='utf-8') as file:
+        file.write(line)
+
+
+class SQLSpans:
+    """Обёртка курсора: каждый SQL-запрос — дочерний спан."""
+
+    def __init__(self, trace, vendor):
+        self.trace = trace
+        self.vendor = vendor
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.trace.span(
+            sql.split(None, 1)[0].upper() if sql else 'SQL',
+            kind=SPAN_KIND_CLIENT,
+            **{'db.system': self.vendor, 'db.statement': sql},
+        ):
+            return execute(sql, params, many, context)
+
+
+def instrument_view(view):
+    for method, name in VIEW_STAGES.items():
+        if hasattr(view, method):
+            setattr(view, method, traced(name, getattr(view, method)))
+    if hasattr(view, 'get_serializer'):
+        get_serializer = view.get_serializer
+
+        @functools.wraps(get_serializer)
+        def traced_get_serializer(*args, **kwargs):
+            serializer = get_serializer(*args, **kwargs)
+            serializer.to_representation = traced(
+                'to_representation', serializer.to_representation
+            )
+            return serializer
+        view.get_serializer = traced_get_serializer
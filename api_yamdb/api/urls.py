@@ -3,7 +3,8 @@ from django.urls import include, path
 
 from api.views import (
     CategoryViewSet, CommentViewSet, GenreViewSet, ReviewViewSet,
-    TitleViewSet, UserViewSet, signup, token
+    TitleViewSet, UserViewSet, export_titles, query_stats, signup,
+    suggest, token
 )
 
 app_name = 'api'
@@ -25,4 +26,7 @@ urlpatterns = [
     path('v1/', include(router_v1.urls)),
     path('v1/auth/signup/', signup, name='signup'),
     path('v1/auth/token/', token, name='token'),
+    path('v1/suggest/', suggest, name='suggest'),
+    path('v1/export/titles/', export_titles, name='export_titles'),
+    path('v1/stats/queries/', query_stats, name='query_stats'),
 ]
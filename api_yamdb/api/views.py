@@ -1,11 +1,13 @@
-import hashlib
-
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.crypto import get_random_string
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import (
     LimitOffsetPagination,
@@ -13,25 +15,36 @@ from rest_framework.pagination import (
 )
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.viewsets import ModelViewSet
 
-from api.filters import GenreTitleFilter
-from api.mixins import ModelMixinSet
+from api import middleware
+from api.authentication import token_for_user
+from api.bitmaps import index as bitmap_index
+from api.export import EXPORT_FORMATS
+from api.filters import (
+    GenreTitleFilter, TitleSearchFilter, get_title_facets,
+    parse_title_facets,
+)
+from api.metrics import registry as metrics_registry
+from api.mixins import CachedResponseMixin, ReferenceMixinSet, TracingMixin
+from api.pagination import OptionalCursorPagination
 from api.permissions import (
     IsAdmin,
     IsAdminOrModeratorOrAuthorOrReadOnly,
     IsAdminUserOrReadOnly,
 )
+from api.reference import reference_data
 from api.serializers import (
     CategorySerializer, CommentSerializer, ConfirmationSerializer,
     CustomUserSerializer, GenreSerializer, ReviewSerializer,
     SignupSerializer, TitleReadSerializer, TitleWriteSerializer,
 )
-from reviews.models import Category, CustomUser, Genre, Title
+from api.suggest import SOURCES, index as suggest_index
+from reviews.models import Category, CustomUser, Genre, Review, Title
+from reviews.outbox import queue_email
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(TracingMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = [IsAdmin]
@@ -57,39 +70,146 @@ class UserViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def perform_destroy(self, instance):
+        title_ids = list(instance.reviews.values_list('title_id', flat=True))
+        with transaction.atomic():
+            instance.delete()
+            Title.objects.filter(pk__in=title_ids).refresh_rating()
+
+
+def signup_conflicts(users, username, email):
+    """Ошибки, если username или email заняты другой парой."""
+    errors = {}
+    for user in users:
+        if user.username == username and user.email != email:
+            errors['username'] = [
+                'Пользователь с таким username уже существует.'
+            ]
+        if user.email == email and user.username != username:
+            errors['email'] = ['Пользователь с таким email уже существует.']
+    return errors
+
+
+def find_signup_user(username, email):
+    """Пользователь с этой парой; одним запросом по уникальным индексам."""
+    users = list(CustomUser.objects.filter(
+        Q(username=username) | Q(email=email)
+    ).only('username', 'email', 'confirmation_code')[:2])
+    errors = signup_conflicts(users, username, email)
+    if errors:
+        raise ValidationError(errors)
+    return users[0] if users else None
+
+
+def signup_user(username, email):
+    """Новый пользователь или уже зарегистрированный с той же парой.
+
+    Код подтверждения создаётся один раз и при повторной регистрации
+    отправляется снова.
+    """
+    user = find_signup_user(username, email)
+    if user is None:
+        user = CustomUser(
+            username=username, email=email,
+            confirmation_code=get_random_string(32),
+        )
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+        except IntegrityError:
+            # Параллельный запрос успел занять username или email.
+            user = find_signup_user(username, email)
+            if user is None:
+                raise ValidationError(
+                    'Не удалось зарегистрировать пользователя.'
+                )
+    elif not user.confirmation_code:
+        # Пользователь создан администратором и кода ещё не получал.
+        user.confirmation_code = get_random_string(32)
+        user.save(update_fields=['confirmation_code'])
+    return user
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def signup(request):
     serializer = SignupSerializer(data=request.data)
-    if CustomUser.objects.filter(
-        username=request.data.get('username'),
-        email=request.data.get('email')
-    ).exists():
-        return Response(request.data, status=status.HTTP_200_OK)
     serializer.is_valid(raise_exception=True)
-    username = serializer.validated_data['username']
-    email = serializer.validated_data['email']
-    salt = hashlib.sha256((username + email).encode('utf-8')).hexdigest()[:6]
-    confirmation_code = hashlib.sha256(
-        (username + salt).encode('utf-8')).hexdigest()
+    user = signup_user(
+        serializer.validated_data['username'],
+        serializer.validated_data['email'],
+    )
+    queue_email(
+        recipient=user.email,
+        subject='Код подтверждения',
+        body=f'{user.confirmation_code} - Код авторизации на сайте',
+        kind='confirmation_code',
+    )
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def suggest(request):
+    """Подсказки по началу названия произведения, жанра или категории."""
     try:
-        user, created = CustomUser.objects.get_or_create(
-            **serializer.validated_data,
-            confirmation_code=confirmation_code
+        limit = min(
+            int(request.query_params.get('limit', 10)),
+            settings.SUGGEST_MAX_LIMIT
         )
-    except Exception as error:
+    except ValueError:
         return Response(
-            f'Получена ошибка ->{error}<-',
+            'Параметр limit должен быть числом',
             status=status.HTTP_400_BAD_REQUEST
         )
-    send_mail(
-        subject='Код подтверждения',
-        message=f'{user.confirmation_code} - Код авторизации на сайте',
-        from_email=settings.FROM_EMAIL,
-        recipient_list=[user.email]
+    kinds = request.query_params.get('type')
+    if kinds:
+        kinds = set(kinds.split(','))
+        if not kinds <= set(SOURCES):
+            return Response(
+                f'Допустимые значения type: {", ".join(SOURCES)}',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    results = suggest_index.search(
+        request.query_params.get('q', ''), limit, kinds
+    )
+    return Response(results, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def export_titles(request):
+    """Потоковая выгрузка всего каталога произведений."""
+    output = request.query_params.get('output', 'ndjson')
+    if output not in EXPORT_FORMATS:
+        return Response(
+            f'Допустимые значения output: {", ".join(EXPORT_FORMATS)}',
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    export, content_type, extension = EXPORT_FORMATS[output]
+    with_reviews = request.query_params.get('reviews') in ('1', 'true')
+    response = StreamingHttpResponse(
+        export(with_reviews), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="titles.{extension}"'
+    )
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def query_stats(request):
+    """SQL-запросы по представлениям за последние запросы процесса."""
+    return Response(middleware.stats.summary(), status=status.HTTP_200_OK)
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus."""
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
     )
-    return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -104,13 +224,17 @@ def token(request):
         return Response(
             'Код неверный', status=status.HTTP_400_BAD_REQUEST
         )
-    refresh = RefreshToken.for_user(user)
+    refresh = token_for_user(user)
     token_data = {'token': str(refresh.access_token)}
 
     return Response(token_data, status=status.HTTP_200_OK)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(TracingMixin, CachedResponseMixin,
+                    viewsets.ModelViewSet):
+    pagination_class = OptionalCursorPagination
+    cache_list_tags = ('review-list:{title_id}', 'title:{title_id}', 'user:*')
+    cache_detail_tags = ('review:{pk}', 'user:*')
     serializer_class = ReviewSerializer
     permission_classes = (IsAdminOrModeratorOrAuthorOrReadOnly,)
 
@@ -122,10 +246,45 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return title.reviews.all()
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title_obj())
+        title = self.get_title_obj()
+        with transaction.atomic():
+            review = serializer.save(author=self.request.user, title=title)
+            Title.objects.filter(pk=title.pk).update_rating(1, review.score)
+
+    @staticmethod
+    def locked_score(review):
+        """Оценка из заблокированной строки, а не из прочитанной ранее."""
+        return Review.objects.select_for_update().filter(
+            pk=review.pk
+        ).values_list('score', flat=True).first()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            old_score = self.locked_score(serializer.instance)
+            if old_score is None:
+                raise Http404
+            review = serializer.save()
+            Title.objects.filter(pk=review.title_id).update_rating(
+                0, review.score - old_score
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            score = self.locked_score(instance)
+            _, deleted = instance.delete()
+            # Отзыв мог удалить параллельный запрос.
+            if deleted.get(Review._meta.label):
+                Title.objects.filter(pk=instance.title_id).update_rating(
+                    -1, -score
+                )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(TracingMixin, CachedResponseMixin,
+                     viewsets.ModelViewSet):
+    pagination_class = OptionalCursorPagination
+    cache_list_tags = ('comment-list:{review_id}', 'review:{review_id}',
+                       'user:*')
+    cache_detail_tags = ('comment:{pk}', 'user:*')
     serializer_class = CommentSerializer
     permission_classes = (IsAdminOrModeratorOrAuthorOrReadOnly,)
 
@@ -142,7 +301,7 @@ class CommentViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user, review=self.get_review_obj())
 
 
-class CategoryViewSet(ModelMixinSet):
+class CategoryViewSet(ReferenceMixinSet):
     """Получить список всех категорий."""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -153,7 +312,7 @@ class CategoryViewSet(ModelMixinSet):
     lookup_field = 'slug'
 
 
-class GenreViewSet(ModelMixinSet):
+class GenreViewSet(ReferenceMixinSet):
     """Получить список всех жанров."""
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
@@ -164,15 +323,51 @@ class GenreViewSet(ModelMixinSet):
     lookup_field = 'slug'
 
 
-class TitleViewSet(ModelViewSet):
+class TitleViewSet(TracingMixin, CachedResponseMixin, ModelViewSet):
     queryset = Title.objects.all()
+    cache_list_tags = ('title-list', 'category:*', 'genre:*')
+    cache_detail_tags = ('title:{pk}', 'category:*', 'genre:*')
     # serializer_class = TitleSerializer
     pagination_class = PageNumberPagination
     permission_classes = (IsAdminUserOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, TitleSearchFilter)
     filterset_class = GenreTitleFilter
+    facets = None
+
+    def list(self, request, *args, **kwargs):
+        facets = request.query_params.get('facets')
+        if facets:
+            # Проверяем до выборки, чтобы не выполнять её зря.
+            self.facets = parse_title_facets(facets)
+        return super().list(request, *args, **kwargs)
+
+    def get_paginated_response(self, data):
+        # Фасеты считаются вместе со страницей и кешируются с ней.
+        response = super().get_paginated_response(data)
+        if self.facets:
+            response.data['facets'] = get_title_facets(
+                super().filter_queryset(self.get_queryset()), self.facets
+            )
+        return response
+
+    def filter_queryset(self, queryset):
+        if self.action == 'list' and bitmap_index.enabled():
+            titles = bitmap_index.filter(queryset, self.request.query_params)
+            if titles is not None:
+                return titles
+        return super().filter_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleReadSerializer
         return TitleWriteSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            # Одно обращение к версии снимка на запрос, а не на объект.
+            context['snapshots'] = {
+                model: reference_data(model).get()
+                for model in (Category, Genre)
+            }
+        return context
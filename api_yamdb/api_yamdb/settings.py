@@ -24,11 +24,15 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'django_filters',
-    'api',
-    'reviews',
+    'api.apps.ApiConfig',
+    'reviews.apps.ReviewsConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ProfilerMiddleware',
+    'api.middleware.TracingMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -108,18 +112,75 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 
 
+# Cache
+
+# Версии снимков справочников и тегов кеша ответов должны быть общими для
+# всех воркеров. LocMemCache годится только для одного процесса; в
+# продакшене задайте разделяемый бэкенд, например
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache и
+# DJANGO_CACHE_LOCATION=yamdb_cache (таблицу создаёт createcachetable).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', ''),
+    },
+    # Версии тегов кеша ответов отдельно от самих ответов, чтобы их не
+    # вытесняли. Для DatabaseCache и memcached задайте своё место
+    # хранения в DJANGO_TAGS_CACHE_LOCATION.
+    'tags': {
+        'BACKEND': os.getenv(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('DJANGO_TAGS_CACHE_LOCATION', 'tags'),
+        'OPTIONS': {'MAX_ENTRIES': 1000000},
+    },
+}
+
+# Снимок справочника перечитывается не реже, чем раз в столько секунд,
+# даже если версия в кеше не менялась.
+REFERENCE_SNAPSHOT_MAX_AGE = 60
+
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+# Кеш ответов инвалидируется версиями тегов в кеше и с кешем в памяти
+# процесса отдавал бы другим воркерам устаревшие ответы. None — включён
+# только при разделяемом бэкенде.
+RESPONSE_CACHE_ENABLED = None
+
+
 AUTH_USER_MODEL = 'reviews.CustomUser'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 FROM_EMAIL = 'admin@yamdb.ru'
+# Очередь писем разбирает команда send_emails.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Задержка перед повтором в секундах, удваивается с каждой попыткой.
+EMAIL_OUTBOX_RETRY_DELAY = 60
+# Через сколько секунд письмо, взятое упавшим отправителем, снова ждёт.
+EMAIL_OUTBOX_LOCK_TIMEOUT = 60 * 5
+
+# Отложенные задачи (reviews.jobs), выполняет команда run_worker.
+JOB_CONCURRENCY = 4
+JOB_RETRY_DELAY = 30
+# Через сколько секунд задача молчащего воркера возвращается в очередь.
+JOB_LOCK_TIMEOUT = 60 * 10
+# Периодические задачи: путь к функции -> период в секундах.
+JOB_PERIODIC = {
+    'reviews.outbox.deliver': 5,
+    'api.profiling.prune_profiles': 60 * 60,
+}
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -132,3 +193,47 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+SUGGEST_INDEX_TTL = 60
+SUGGEST_MAX_LIMIT = 50
+
+TITLE_BITMAP_INDEX = False
+TITLE_BITMAP_INDEX_TTL = 60
+# Больше найденных произведений — фильтр выполняет SQL, а не индекс.
+TITLE_BITMAP_MAX_IDS = 1000
+
+EXPORT_CHUNK_SIZE = 2000
+
+QUERY_STATS_ENABLED = True
+QUERY_STATS_WINDOW = 500
+# Заголовки X-DB-Queries, X-DB-Duplicates и Server-Timing раскрывают
+# устройство запросов к базе. None — только при DEBUG и администраторам.
+QUERY_STATS_HEADERS = None
+
+METRICS_ENABLED = True
+# Папка для значений метрик воркеров gunicorn; без неё — только процесс.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1
+
+PROFILER_ENABLED = True
+# Профилировать случайный 1 из N запросов; 0 — только по флагу.
+PROFILER_SAMPLE_RATE = 0
+PROFILER_FORMAT = 'pstats'
+PROFILER_INTERVAL = 0.001
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+# Профили сверх последних PROFILER_MAX_PROFILES или старше PROFILER_MAX_AGE
+# секунд удаляет периодическая задача api.profiling.prune_profiles.
+PROFILER_MAX_PROFILES = 1000
+PROFILER_MAX_AGE = 60 * 60 * 24 * 7
+
+TRACING_ENABLED = False
+# Доля трассируемых запросов.
+TRACING_SAMPLE_RATE = 0.01
+# Сети, чей traceparent с флагом sampled трассируется всегда (шлюз,
+# соседние сервисы); у остальных клиентов флаг не учитывается.
+TRACING_TRUSTED_NETWORKS = []
+TRACING_FILE = os.path.join(BASE_DIR, 'traces', 'traces.jsonl')
+TRACING_SERVICE_NAME = 'yamdb'
+
+# Сколько секунд версия роли из кеша считается актуальной.
+ROLE_VERSION_TTL = 60
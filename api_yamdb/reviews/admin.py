@@ -1,5 +1,6 @@
 from django.contrib import admin
-from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+from reviews.models import (Category, Comment, CustomUser, Genre, Job,
+                            OutboxEmail, RequestProfile, Review, Title)
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -19,7 +20,8 @@ class GenreAdmin(admin.ModelAdmin):
 
 
 class GenreTitleAdmin(admin.ModelAdmin):
-    list_display = ("pk", "name", "year", "description", "category")
+    list_display = ("pk", "name", "year", "description", "category",
+                    "rating")
 
 
 class ReviewAdmin(admin.ModelAdmin):
@@ -30,9 +32,34 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ("pk", "text", "review", "author", "pub_date")
 
 
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ("view", "method", "path", "status", "duration_ms",
+                    "queries", "sampled", "created", "filename")
+    list_filter = ("view", "sampled")
+    search_fields = ("path",)
+    ordering = ("-duration_ms",)
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("pk", "recipient", "kind", "status", "attempts",
+                    "next_attempt", "created", "sent")
+    list_filter = ("status", "kind")
+    search_fields = ("recipient",)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "status", "run_at", "interval",
+                    "attempts", "locked_by", "finished")
+    list_filter = ("status", "name")
+    search_fields = ("name",)
+
+
 admin.site.register(CustomUser, UserAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Genre, GenreAdmin)
 admin.site.register(Title, GenreTitleAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(RequestProfile, RequestProfileAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
+admin.site.register(Job, JobAdmin)
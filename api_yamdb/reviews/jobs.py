@@ -0,0 +1,202 @@
+"""Отложенные задачи в базе данных без брокера.
+
+Задача — строка таблицы Job с путём к функции (`reviews.outbox.deliver`)
+и именованными аргументами в JSON. `enqueue()` ставит задачу, в том
+числе на время в будущем; периодические задачи перечислены в
+`JOB_PERIODIC` и хранятся одной строкой, которая после выполнения
+переносится на `interval` секунд вперёд.
+
+Выполняет задачи команда run_worker: пул потоков на
+`JOB_CONCURRENCY` задач. Задачи забираются через
+`select_for_update(skip_locked=True)` там, где база это умеет, поэтому
+воркеров можно запускать несколько. Упавшая задача повторяется с
+задержкой `JOB_RETRY_DELAY * 2 ** (попытка - 1)` секунд, задача
+упавшего воркера возвращается в очередь через `JOB_LOCK_TIMEOUT`.
+"""
+import json
+import os
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from reviews.models import Job
+
+
+def job_name(func):
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, run_at=None, delay=None, max_attempts=None, **kwargs):
+    """Ставит вызов func(**kwargs) в очередь.
+
+    `run_at` или `delay` (секунды) откладывают запуск.
+    """
+    if run_at is None:
+        run_at = timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+    fields = {}
+    if max_attempts is not None:
+        fields['max_attempts'] = max_attempts
+    return Job.objects.create(
+        name=job_name(func),
+        payload=json.dumps(kwargs, cls=DjangoJSONEncoder),
+        run_at=run_at,
+        **fields,
+    )
+
+
+def schedule_periodic(periodic=None):
+    """Приводит периодические задачи в базе к настройке JOB_PERIODIC."""
+    if periodic is None:
+        periodic = settings.JOB_PERIODIC
+    Job.objects.filter(interval__isnull=False).exclude(
+        name__in=list(periodic)
+    ).delete()
+    for name, interval in periodic.items():
+        if Job.objects.filter(name=name, interval__isnull=False).update(
+            interval=interval
+        ):
+            continue
+        try:
+            with transaction.atomic():
+                Job.objects.create(name=name, interval=interval)
+        except IntegrityError:
+            # Задачу успел создать другой воркер.
+            pass
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, переставших отвечать."""
+    deadline = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=deadline
+    ).update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def claim(limit, worker):
+    """Забирает до `limit` задач, срок которых подошёл."""
+    now = timezone.now()
+    token = f'{worker}:{uuid.uuid4().hex[:12]}'
+    with transaction.atomic():
+        due = Job.objects.filter(
+            status=Job.QUEUED, run_at__lte=now
+        ).order_by('run_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:limit])
+        if not ids:
+            return []
+        # Без блокировки строк задачу получает тот, чей UPDATE её застал
+        # в очереди.
+        Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=token, locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(locked_by=token, status=Job.RUNNING))
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def reschedule(job, error, now):
+    if job.interval is not None:
+        job.status = Job.QUEUED
+        job.run_at = now + timedelta(seconds=job.interval)
+        job.attempts = 0
+    elif error is None:
+        job.status = Job.DONE
+        job.finished = now
+    elif job.attempts < job.max_attempts:
+        job.status = Job.QUEUED
+        job.run_at = now + retry_delay(job.attempts)
+    else:
+        job.status = Job.FAILED
+        job.finished = now
+
+
+def run_job(job):
+    """Выполняет задачу и сохраняет результат. True, если без ошибки."""
+    error = None
+    try:
+        func = import_string(job.name)
+        func(**json.loads(job.payload))
+    except Exception as exception:
+        error = exception
+        job.last_error = ''.join(traceback.format_exception(
+            type(error), error, error.__traceback__
+        ))
+    else:
+        job.last_error = ''
+    reschedule(job, error, timezone.now())
+    # Пока задача выполнялась, её могли вернуть в очередь как зависшую
+    # и отдать другому воркеру: тогда итог сохраняет он.
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=job.status, run_at=job.run_at, attempts=job.attempts,
+        finished=job.finished, last_error=job.last_error,
+        locked_by='', locked_at=None,
+    )
+    job.locked_by = ''
+    job.locked_at = None
+    return error is None
+
+
+class Worker:
+    """Забирает задачи из очереди и выполняет их в пуле потоков."""
+
+    def __init__(self, concurrency=None, poll_interval=1.0):
+        self.concurrency = concurrency or settings.JOB_CONCURRENCY
+        self.poll_interval = poll_interval
+        self.id = f'{socket.gethostname()[:24]}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.done = 0
+        self.failed = 0
+
+    def stop(self):
+        self.stopping.set()
+
+    def execute(self, job):
+        try:
+            if run_job(job):
+                self.done += 1
+            else:
+                self.failed += 1
+        finally:
+            # У каждого потока пула своё соединение с базой.
+            connection.close()
+
+    def run(self, once=False):
+        """Работает до stop(); с `once` — пока есть задачи к запуску."""
+        schedule_periodic()
+        running = set()
+        with ThreadPoolExecutor(
+            self.concurrency, thread_name_prefix='job'
+        ) as pool:
+            while not self.stopping.is_set():
+                requeue_stale()
+                running = {future for future in running if not future.done()}
+                free = self.concurrency - len(running)
+                jobs = claim(free, self.id) if free else []
+                for job in jobs:
+                    running.add(pool.submit(self.execute, job))
+                if jobs:
+                    continue
+                if once and not running:
+                    break
+                if running:
+                    wait(running, self.poll_interval, FIRST_COMPLETED)
+                else:
+                    self.stopping.wait(self.poll_interval)
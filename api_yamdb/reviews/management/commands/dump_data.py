@@ -0,0 +1,137 @@
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from reviews.management.commands.load_data import TABLES, open_csv
+from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+
+COLUMNS = {
+    CustomUser: ('id', 'username', 'email', 'role', 'bio', 'first_name',
+                 'last_name'),
+    Category: ('id', 'name', 'slug'),
+    Genre: ('id', 'name', 'slug'),
+    Title: ('id', 'name', 'year', 'category', 'description'),
+    Title.genre.through: ('id', 'title_id', 'genre_id'),
+    Review: ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    Comment: ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+
+CHUNK_SIZE = 5000
+
+
+def csv_value(value):
+    """Значение в формате файлов static/data."""
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat') and hasattr(value, 'tzinfo'):
+        value = value.isoformat(timespec='milliseconds')
+        return value.replace('+00:00', 'Z')
+    return value
+
+
+def start_snapshot(snapshot_id=None):
+    """Переводит транзакцию PostgreSQL на REPEATABLE READ.
+
+    В SQLite транзакция чтения и так видит один снимок базы. Потоки
+    `--parallel` подключаются к снимку основной транзакции по
+    `snapshot_id` из `pg_export_snapshot()`.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY'
+        )
+        if snapshot_id is not None:
+            cursor.execute('SET TRANSACTION SNAPSHOT %s', [snapshot_id])
+
+
+def export_snapshot():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_export_snapshot()')
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = 'Выгружает данные в CSV-файлы в формате команды load_data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=os.path.join(settings.BASE_DIR, 'data_dump'),
+            help='Папка для CSV-файлов.'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать файлы (load_data читает *.csv.gz).'
+        )
+        parser.add_argument(
+            '--parallel', type=int, default=1,
+            help='Сколько таблиц выгружать одновременно (только '
+                 'PostgreSQL).'
+        )
+
+    def dump_table(self, model, path):
+        columns = COLUMNS[model]
+        names = [model._meta.get_field(column).attname for column in columns]
+        dumped = 0
+        started = time.monotonic()
+        with open_csv(path, 'w') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(columns)
+            for row in model.objects.order_by('pk').values_list(
+                *names
+            ).iterator(CHUNK_SIZE):
+                writer.writerow([csv_value(value) for value in row])
+                dumped += 1
+        elapsed = time.monotonic() - started
+        return (
+            f'{os.path.basename(path)}: {dumped} строк за {elapsed:.2f} с '
+            f'({dumped / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+
+    def dump_in_thread(self, snapshot_id, model, path):
+        try:
+            with transaction.atomic():
+                start_snapshot(snapshot_id)
+                return self.dump_table(model, path)
+        finally:
+            # Каждый поток открывает своё соединение с базой.
+            connection.close()
+
+    def handle(self, *args, **options):
+        os.makedirs(options['path'], exist_ok=True)
+        suffix = '.gz' if options['gzip'] else ''
+        paths = {
+            model: os.path.join(options['path'], filename + suffix)
+            for model, filename in TABLES.items()
+        }
+        parallel = options['parallel']
+        if parallel > 1 and connection.vendor != 'postgresql':
+            raise CommandError(
+                '--parallel поддерживается только для PostgreSQL: потоки '
+                'другой базы не увидят общего снимка.'
+            )
+        # Все таблицы читаются из одного снимка: отзыв не попадёт в
+        # выгрузку без своего произведения, даже если база меняется.
+        with transaction.atomic():
+            start_snapshot()
+            if parallel > 1:
+                snapshot_id = export_snapshot()
+                with ThreadPoolExecutor(parallel) as executor:
+                    reports = executor.map(
+                        self.dump_in_thread, [snapshot_id] * len(paths),
+                        paths, paths.values()
+                    )
+                    for report in reports:
+                        self.stdout.write(report)
+            else:
+                for model, path in paths.items():
+                    self.stdout.write(self.dump_table(model, path))
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные выгружены в {options["path"]}'
+        ))
@@ -0,0 +1,197 @@
+import datetime as dt
+import random
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.cache import caches
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from reviews.management.commands.load_data import (keep_csv_dates,
+                                                   reset_sequences)
+from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+
+WORDS = (
+    'война', 'мир', 'тихий', 'дон', 'мастер', 'город', 'ночь', 'звезда',
+    'дорога', 'сказка', 'песня', 'море', 'зима', 'лето', 'последний',
+    'белый', 'красный', 'старый', 'новый', 'тайна', 'остров', 'дом', 'сад',
+    'поезд', 'река', 'небо', 'огонь', 'ветер', 'герой', 'сон', 'путь',
+)
+# Оценки смещены к высоким, как в реальных каталогах.
+SCORE_WEIGHTS = (2, 1, 1, 2, 3, 5, 9, 14, 16, 12)
+
+
+def next_id(model):
+    return (model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+
+
+def review_counts(rng, titles, reviews, users):
+    """Отзывов на произведение: распределение Парето, не больше users."""
+    weights = [rng.paretovariate(1.16) for _ in range(titles)]
+    total = sum(weights)
+    counts = [min(users, int(weight * reviews / total)) for weight in weights]
+    remainder = reviews - sum(counts)
+    position = 0
+    while remainder > 0:
+        if counts[position] < users:
+            counts[position] += 1
+            remainder -= 1
+        position = (position + 1) % titles
+    return counts
+
+
+def review_pairs(rng, counts, users):
+    """Пары (произведение, автор) без повторов для unique_review."""
+    for title, count in enumerate(counts):
+        # Подряд идущие авторы со случайного места: внутри одного
+        # произведения не повторяются, так как count <= users.
+        offset = rng.randrange(users)
+        for number in range(count):
+            yield title, (offset + number) % users
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных тестов.'
+
+    def add_arguments(self, parser):
+        for name, default in (
+            ('users', 1000),
+            ('categories', 5),
+            ('genres', 20),
+            ('titles', 10000),
+            ('reviews', 100000),
+            ('comments', 50000),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Сколько создать: {name} (по умолчанию {default}).'
+            )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def insert(self, model, objects, batch_size):
+        created = 0
+        started = time.monotonic()
+        with keep_csv_dates(model):
+            while True:
+                batch = list(islice(objects, batch_size))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    model.objects.bulk_create(batch)
+                created += len(batch)
+        reset_sequences(model)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{model._meta.db_table}: {created} строк за {elapsed:.2f} с '
+            f'({created / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+
+    def phrase(self, rng, words):
+        return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        users, titles = options['users'], options['titles']
+        reviews, comments = options['reviews'], options['comments']
+        if reviews > users * titles:
+            raise CommandError(
+                'Отзывов больше, чем пар пользователь-произведение: '
+                'ограничение unique_review не выполнить.'
+            )
+        if comments and not reviews:
+            raise CommandError('Комментариям нужны отзывы.')
+        now = timezone.now()
+        first_user = next_id(CustomUser)
+        first_category = next_id(Category)
+        first_genre = next_id(Genre)
+        first_title = next_id(Title)
+        first_review = next_id(Review)
+
+        self.insert(CustomUser, (
+            CustomUser(
+                pk=first_user + idx,
+                username=f'user{first_user + idx}',
+                email=f'user{first_user + idx}@yamdb.fake',
+                password=UNUSABLE_PASSWORD_PREFIX,
+            )
+            for idx in range(users)
+        ), batch_size)
+        self.insert(Category, (
+            Category(
+                pk=first_category + idx,
+                name=f'Категория {first_category + idx}',
+                slug=f'category-{first_category + idx}',
+            )
+            for idx in range(options['categories'])
+        ), batch_size)
+        self.insert(Genre, (
+            Genre(
+                pk=first_genre + idx,
+                name=f'Жанр {first_genre + idx}',
+                slug=f'genre-{first_genre + idx}',
+            )
+            for idx in range(options['genres'])
+        ), batch_size)
+        self.insert(Title, (
+            Title(
+                pk=first_title + idx,
+                name=f'{self.phrase(rng, 2).capitalize()} {idx}',
+                year=rng.randint(1900, now.year),
+                category_id=first_category + rng.randrange(
+                    options['categories']
+                ) if options['categories'] else None,
+                description=self.phrase(rng, 12),
+            )
+            for idx in range(titles)
+        ), batch_size)
+        if options['genres']:
+            self.insert(Title.genre.through, (
+                Title.genre.through(
+                    title_id=first_title + idx, genre_id=first_genre + genre
+                )
+                for idx in range(titles)
+                for genre in rng.sample(
+                    range(options['genres']),
+                    rng.randint(1, min(3, options['genres']))
+                )
+            ), batch_size)
+
+        counts = review_counts(rng, titles, reviews, users) if reviews else []
+        self.insert(Review, (
+            Review(
+                pk=first_review + number,
+                title_id=first_title + title,
+                author_id=first_user + author,
+                score=rng.choices(range(1, 11), SCORE_WEIGHTS)[0],
+                text=self.phrase(rng, 20),
+                pub_date=now - dt.timedelta(
+                    seconds=rng.randrange(10 * 365 * 24 * 3600)
+                ),
+            )
+            for number, (title, author) in enumerate(
+                review_pairs(rng, counts, users)
+            )
+        ), batch_size)
+        self.insert(Comment, (
+            Comment(
+                review_id=first_review + rng.randrange(reviews),
+                author_id=first_user + rng.randrange(users),
+                text=self.phrase(rng, 10),
+                pub_date=now - dt.timedelta(
+                    seconds=rng.randrange(365 * 24 * 3600)
+                ),
+            )
+            for _ in range(comments)
+        ), batch_size)
+
+        Title.objects.filter(pk__gte=first_title).refresh_rating()
+        # bulk_create не отправляет сигналы: сбрасываем кеши API целиком.
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы'))
@@ -1,30 +1,277 @@
 import csv
+import gzip
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
 
 from django.conf import settings
+from django.core.cache import caches
 from django.core.management import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
 
-from reviews.models import Category, Comment, Genre, Review, Title, CustomUser
+from reviews.models import (Category, Comment, CustomUser, Genre,
+                            ImportCheckpoint, Review, Title)
 
 TABLES = {
     CustomUser: 'users.csv',
     Category: 'category.csv',
     Genre: 'genre.csv',
     Title: 'titles.csv',
+    Title.genre.through: 'genre_title.csv',
     Review: 'review.csv',
     Comment: 'comments.csv',
 }
 
+BATCH_SIZE = 5000
+# Сколько байт из начала файла входит в контрольную сумму.
+CHECKSUM_HEAD_SIZE = 1024 * 1024
+
+
+def dependency_order(models):
+    """Упорядочивает модели так, чтобы связанные загружались раньше."""
+    ordered, pending = [], list(models)
+    while pending:
+        for model in pending:
+            dependencies = {
+                field.related_model for field in model._meta.fields
+                if field.is_relation and field.related_model in pending
+                and field.related_model is not model
+            }
+            if not dependencies:
+                ordered.append(model)
+                pending.remove(model)
+                break
+        else:
+            raise ValueError(f'Циклическая зависимость: {pending}')
+    return ordered
+
+
+def csv_fields(model, header):
+    """Поля модели для колонок CSV (`author` -> поле `author`)."""
+    return [model._meta.get_field(column) for column in header]
+
+
+def file_checksum(path):
+    """Сумма начала файла, его размера и времени изменения.
+
+    Весь файл не читается: для многогигабайтного CSV это дольше самой
+    докачки, а дописанный или заменённый файл меняет размер или время.
+    """
+    stat = os.stat(path)
+    checksum = hashlib.sha256(f'{stat.st_size}:{stat.st_mtime_ns}:'.encode())
+    with open(path, 'rb') as file:
+        checksum.update(file.read(CHECKSUM_HEAD_SIZE))
+    return checksum.hexdigest()
+
+
+def resolve_path(path):
+    """Путь к CSV-файлу или к его сжатой копии `*.csv.gz`."""
+    if not os.path.exists(path) and os.path.exists(f'{path}.gz'):
+        return f'{path}.gz'
+    return path
+
+
+def open_csv(path, mode='r'):
+    if path.endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def open_binary(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+class OffsetLines:
+    """Строки файла для `csv.reader` со смещением после прочитанных."""
+
+    def __init__(self, file):
+        self.file = file
+        self.offset = file.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.file.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode('utf-8')
+
+
+def to_python(field, value):
+    if value == '' and field.null:
+        return None
+    return field.to_python(value)
+
+
+def read_batches(path, model, batch_size, offset=0):
+    """Объекты модели из CSV пачками, начиная с байта `offset`.
+
+    Вместе с пачкой отдаётся смещение в файле сразу после неё.
+    """
+    with open_binary(path) as file:
+        lines = OffsetLines(file)
+        fields = csv_fields(model, next(csv.reader(lines)))
+        if offset:
+            file.seek(offset)
+            lines.offset = offset
+        rows = (
+            model(**{
+                field.attname: to_python(field, value)
+                for field, value in zip(fields, row)
+            })
+            for row in csv.reader(lines)
+        )
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield fields, batch, lines.offset
+
+
+def upsert(model, fields, batch):
+    """Создаёт новые строки и обновляет изменившиеся."""
+    names = [
+        field.attname for field in fields if not field.primary_key
+    ]
+    existing = model.objects.only(*names).in_bulk(
+        [obj.pk for obj in batch]
+    )
+    created = [obj for obj in batch if obj.pk not in existing]
+    changed = [
+        obj for obj in batch if obj.pk in existing and any(
+            getattr(obj, name) != getattr(existing[obj.pk], name)
+            for name in names
+        )
+    ]
+    model.objects.bulk_create(created)
+    if changed and names:
+        model.objects.bulk_update(changed, names, batch_size=len(batch))
+    return len(created), len(changed)
+
+
+@contextmanager
+def keep_csv_dates(model):
+    """Не даёт `auto_now_add` затереть даты из CSV."""
+    fields = [
+        field for field in model._meta.fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def reset_sequences(model):
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
 
 class Command(BaseCommand):
+    help = 'Загружает данные из CSV-файлов в static/data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=os.path.join(settings.BASE_DIR, 'static/data'),
+            help='Папка с CSV-файлами.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество строк в одном INSERT.'
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Обновлять существующие строки и продолжать прерванную '
+                 'загрузку с последней сохранённой пачки.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='В режиме --upsert игнорировать сохранённый прогресс.'
+        )
+
+    def report(self, filename, loaded, started, extra=''):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{filename}: {loaded} строк за {elapsed:.2f} с '
+            f'({loaded / elapsed if elapsed else 0:.0f} строк/с){extra}'
+        )
+
+    def load_table(self, model, path, batch_size):
+        loaded = 0
+        started = time.monotonic()
+        with transaction.atomic(), keep_csv_dates(model):
+            for _, batch, _ in read_batches(path, model, batch_size):
+                model.objects.bulk_create(batch)
+                loaded += len(batch)
+            reset_sequences(model)
+        self.report(os.path.basename(path), loaded, started)
+
+    def upsert_table(self, model, path, batch_size, restart):
+        filename = os.path.basename(path)
+        checksum = file_checksum(path)
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            filename=filename, defaults={'checksum': checksum}
+        )
+        if restart or checkpoint.checksum != checksum:
+            checkpoint.checksum = checksum
+            checkpoint.rows_done = 0
+            checkpoint.offset = 0
+            checkpoint.completed = False
+            checkpoint.save()
+        if checkpoint.completed:
+            self.stdout.write(f'{filename}: без изменений, пропущен')
+            return
+        skipped = checkpoint.rows_done
+        loaded = created = changed = 0
+        started = time.monotonic()
+        with keep_csv_dates(model):
+            for fields, batch, offset in read_batches(
+                path, model, batch_size, offset=checkpoint.offset
+            ):
+                with transaction.atomic():
+                    batch_created, batch_changed = upsert(
+                        model, fields, batch
+                    )
+                    checkpoint.rows_done += len(batch)
+                    checkpoint.offset = offset
+                    checkpoint.save(
+                        update_fields=('rows_done', 'offset', 'updated')
+                    )
+                loaded += len(batch)
+                created += batch_created
+                changed += batch_changed
+        with transaction.atomic():
+            reset_sequences(model)
+            checkpoint.completed = True
+            checkpoint.save(update_fields=('completed', 'updated'))
+        self.report(
+            filename, loaded, started,
+            f', новых {created}, изменено {changed}'
+            + (f', пропущено {skipped}' if skipped else '')
+        )
 
-    def handle(self, *args, **kwargs):
-        for model, csv_f in TABLES.items():
-            with open(
-                f'{settings.BASE_DIR}/static/data/{csv_f}',
-                'r',
-                encoding='utf-8'
-            ) as csv_file:
-                reader = csv.DictReader(csv_file)
-                model.objects.bulk_create(
-                    model(**data) for data in reader)
+    def handle(self, *args, **options):
+        for model in dependency_order(TABLES):
+            path = resolve_path(os.path.join(options['path'], TABLES[model]))
+            if options['upsert']:
+                self.upsert_table(
+                    model, path, options['batch_size'], options['restart']
+                )
+            else:
+                self.load_table(model, path, options['batch_size'])
+        Title.objects.refresh_rating()
+        # bulk_create не отправляет сигналы: сбрасываем кеши API целиком.
+        for alias in settings.CACHES:
+            caches[alias].clear()
         self.stdout.write(self.style.SUCCESS('Все данные загружены'))
@@ -0,0 +1,37 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from reviews.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет отложенные и периодические задачи из таблицы Job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOB_CONCURRENCY,
+            help='Сколько задач выполнять одновременно.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза в секундах, когда задач к запуску нет.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить задачи, срок которых подошёл, и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(options['concurrency'], options['interval'])
+        if threading.current_thread() is threading.main_thread():
+            # Начатые задачи доделываются, новые не берутся.
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: worker.stop())
+        worker.run(once=options['once'])
+        if options['verbosity'] > 0:
+            self.stdout.write(
+                f'Выполнено задач: {worker.done}, с ошибкой: {worker.failed}.'
+            )
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from reviews.outbox import deliver
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutboxEmail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Сколько писем отправлять через одно соединение.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            sent, failed = deliver(batch_size)
+            if (sent or failed) and options['verbosity'] > 0:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, ошибок: {failed}.'
+                )
+            # Полная пачка — в очереди могут быть ещё письма.
+            if sent + failed == batch_size:
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import models, router
+from django.db.models import (Avg, Case, Count, F, FloatField, OuterRef, Q,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 
 from reviews.validators import validate_username, validate_year, validate_genre
 
@@ -79,6 +83,36 @@ class CustomUser(AbstractUser):
         return self.username
 
 
+class ClaimsUser(CustomUser):
+    """Пользователь, собранный из утверждений JWT без запроса к базе.
+
+    Известны только id, username, role, is_superuser и is_active;
+    остальные поля отложены и при первом обращении загружаются из базы
+    одним запросом.
+    """
+
+    CLAIM_FIELDS = ('id', 'username', 'role', 'is_superuser', 'is_active')
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, **claims):
+        field_names = [
+            field.attname for field in cls._meta.concrete_fields
+        ]
+        values = [
+            claims.get(name, models.DEFERRED) for name in field_names
+        ]
+        return cls.from_db(router.db_for_read(cls), field_names, values)
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields)
+
+
 class Genre(models.Model):
     """Модель жанры."""
 
@@ -105,6 +139,42 @@ class Category(models.Model):
         return self.slug
 
 
+class TitleQuerySet(models.QuerySet):
+    """Операции над хранимым рейтингом произведений."""
+
+    def update_rating(self, count_delta, score_delta):
+        """Сдвигает счётчики отзывов и пересчитывает рейтинг."""
+        self.update(
+            reviews_count=F('reviews_count') + count_delta,
+            score_sum=F('score_sum') + score_delta,
+        )
+        return self.update(rating=Case(
+            When(reviews_count=0, then=Value(None)),
+            default=Cast('score_sum', FloatField()) / F('reviews_count'),
+            output_field=FloatField(),
+        ))
+
+    def refresh_rating(self):
+        """Пересчитывает счётчики и рейтинг по таблице отзывов."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            reviews_count=Coalesce(Subquery(
+                reviews.annotate(count=Count('pk')).values('count'),
+                output_field=models.IntegerField()
+            ), 0),
+            score_sum=Coalesce(Subquery(
+                reviews.annotate(total=Sum('score')).values('total'),
+                output_field=models.IntegerField()
+            ), 0),
+            rating=Subquery(
+                reviews.annotate(avg=Avg('score')).values('avg'),
+                output_field=FloatField()
+            ),
+        )
+
+
 class Title(models.Model):
     """Модель Произведение."""
 
@@ -136,6 +206,23 @@ class Title(models.Model):
         null=True,
         verbose_name='Описание'
     )
+    reviews_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False
+    )
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False
+    )
+    rating = models.FloatField(
+        'Рейтинг',
+        null=True,
+        editable=False
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
@@ -167,7 +254,13 @@ class Review(models.Model):
                 name='unique_review'
             )
         ]
-        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            )
+        ]
+        ordering = ('-pub_date', '-id')
 
 
 class Comment(models.Model):
@@ -179,4 +272,174 @@ class Comment(models.Model):
     pub_date = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            )
+        ]
+        ordering = ('-pub_date', '-id')
+
+
+class ImportCheckpoint(models.Model):
+    """Прогресс загрузки CSV-файла командой load_data."""
+
+    filename = models.CharField('Файл', max_length=255, unique=True)
+    checksum = models.CharField('Контрольная сумма', max_length=64)
+    rows_done = models.PositiveIntegerField('Загружено строк', default=0)
+    offset = models.BigIntegerField('Смещение в файле, байт', default=0)
+    completed = models.BooleanField('Загружен полностью', default=False)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+
+    def __str__(self):
+        return f'{self.filename}: {self.rows_done}'
+
+
+class RequestProfile(models.Model):
+    """Профиль запроса к API, снятый ProfilerMiddleware."""
+
+    view = models.CharField('Представление', max_length=150, db_index=True)
+    method = models.CharField('Метод', max_length=10)
+    path = models.CharField('Адрес', max_length=2000)
+    status = models.PositiveSmallIntegerField('Статус')
+    duration_ms = models.FloatField('Время, мс', db_index=True)
+    queries = models.PositiveIntegerField('SQL-запросов', null=True)
+    sampled = models.BooleanField('Случайная выборка', default=False)
+    filename = models.CharField('Файл профиля', max_length=255)
+    created = models.DateTimeField('Создан', auto_now_add=True)
+
+    class Meta:
+        ordering = ('-duration_ms',)
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.view}: {self.duration_ms:.1f} мс'
+
+
+class OutboxEmail(models.Model):
+    """Письмо в очереди на отправку командой send_emails."""
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    ]
+
+    recipient = models.EmailField('Получатель', max_length=254)
+    kind = models.CharField('Тип письма', max_length=50)
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.EmailField('Отправитель', max_length=254)
+    status = models.CharField(
+        'Статус', max_length=16, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    next_attempt = models.DateTimeField(
+        'Следующая попытка', default=timezone.now
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent = models.DateTimeField('Отправлено', null=True, blank=True)
+    locked_by = models.CharField('Отправитель пачки', max_length=32,
+                                 blank=True)
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Письма в очереди'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt'],
+                         name='outbox_status_next_idx'),
+        ]
+        constraints = [
+            # Повторная регистрация заменяет ещё не отправленное письмо.
+            models.UniqueConstraint(
+                fields=['recipient', 'kind'],
+                condition=Q(status='pending'),
+                name='outbox_pending_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} -> {self.recipient}: {self.status}'
+
+
+class Job(models.Model):
+    """Отложенная задача для команды run_worker."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField('Функция', max_length=255)
+    payload = models.TextField('Аргументы (JSON)', default='{}')
+    status = models.CharField(
+        'Статус', max_length=16, choices=STATUSES, default=QUEUED
+    )
+    run_at = models.DateTimeField('Запуск не раньше', default=timezone.now)
+    interval = models.PositiveIntegerField(
+        'Период, с', null=True, blank=True,
+        help_text='Периодическая задача перезапускается через столько '
+                  'секунд после завершения.'
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток', default=3
+    )
+    locked_by = models.CharField('Воркер', max_length=64, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='job_status_run_at_idx'),
+        ]
+        constraints = [
+            # Каждая периодическая задача существует в одном экземпляре.
+            models.UniqueConstraint(
+                fields=['name'], condition=Q(interval__isnull=False),
+                name='job_periodic_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name}: {self.status}'
+
+
+class TitleSearchIndex(models.Model):
+    """Строка таблицы FTS5 полнотекстового поиска (только SQLite).
+
+    Таблицу создаёт `reviews.search.install_search_index`. Поле `query`
+    — скрытый столбец с именем таблицы: равенство ему равносильно
+    `MATCH`, поэтому поиск — это одно соединение с индексом.
+    """
+
+    title = models.OneToOneField(
+        Title, primary_key=True, db_column='rowid',
+        on_delete=models.DO_NOTHING, related_name='search_index',
+    )
+    query = models.TextField(db_column='reviews_title_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'reviews_title_fts'
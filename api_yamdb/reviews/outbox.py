@@ -0,0 +1,136 @@
+"""Очередь писем в базе данных.
+
+Представления только записывают письмо в таблицу OutboxEmail, а
+отправляет их команда send_emails: пачкой через одно соединение
+`EMAIL_BACKEND`. Неудачная отправка повторяется с растущей задержкой
+`EMAIL_OUTBOX_RETRY_DELAY * 2 ** (попытка - 1)` секунд, после
+`EMAIL_OUTBOX_MAX_ATTEMPTS` попыток письмо помечается неотправленным.
+Пока письмо ждёт отправки, повторное письмо того же типа тому же
+получателю заменяет его, а не встаёт в очередь вторым.
+
+Отправителей может работать несколько: пачка забирается так же, как
+задачи в reviews.jobs, а письмо переносится на
+`EMAIL_OUTBOX_LOCK_TIMEOUT` секунд вперёд, чтобы его не взял другой
+отправитель. Письмо, заменённое во время отправки, остаётся ждать.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from reviews.models import OutboxEmail
+
+
+def queue_email(recipient, subject, body, kind):
+    """Ставит письмо в очередь или обновляет ждущее отправки."""
+    fields = {
+        'subject': subject,
+        'body': body,
+        'from_email': settings.FROM_EMAIL,
+        'attempts': 0,
+        'next_attempt': timezone.now(),
+        'last_error': '',
+        'locked_by': '',
+    }
+    try:
+        with transaction.atomic():
+            OutboxEmail.objects.create(
+                recipient=recipient, kind=kind, **fields
+            )
+        return
+    except IntegrityError:
+        pass
+    # Письмо уже ждёт отправки — заменяем его. Если его успели
+    # отправить, ставим новое.
+    if not OutboxEmail.objects.filter(
+        recipient=recipient, kind=kind, status=OutboxEmail.PENDING
+    ).update(**fields):
+        OutboxEmail.objects.create(recipient=recipient, kind=kind, **fields)
+
+
+def retry_delay(attempts):
+    return timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def claim(batch_size, now):
+    """Забирает пачку писем, срок которых подошёл."""
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        due = OutboxEmail.objects.filter(
+            status=OutboxEmail.PENDING, next_attempt__lte=now
+        ).order_by('next_attempt', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        # Без блокировки строк письмо получает тот, чей UPDATE застал
+        # его ждущим.
+        OutboxEmail.objects.filter(
+            pk__in=ids, status=OutboxEmail.PENDING, next_attempt__lte=now
+        ).update(
+            locked_by=token,
+            next_attempt=now + timedelta(
+                seconds=settings.EMAIL_OUTBOX_LOCK_TIMEOUT
+            ),
+        )
+    return list(OutboxEmail.objects.filter(
+        locked_by=token, status=OutboxEmail.PENDING
+    ).order_by('pk'))
+
+
+def finish(email, **fields):
+    """Сохраняет итог, если письмо не заменили во время отправки."""
+    OutboxEmail.objects.filter(
+        pk=email.pk, locked_by=email.locked_by
+    ).update(locked_by='', **fields)
+
+
+def mark_failed(email, error, now):
+    attempts = email.attempts + 1
+    fields = {'attempts': attempts, 'last_error': repr(error)}
+    if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        fields['status'] = OutboxEmail.FAILED
+    else:
+        fields['next_attempt'] = now + retry_delay(attempts)
+    finish(email, **fields)
+
+
+def deliver(batch_size=None):
+    """Отправляет пачку писем, срок которых подошёл.
+
+    Возвращает пару (отправлено, не удалось отправить).
+    """
+    now = timezone.now()
+    emails = claim(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE, now)
+    if not emails:
+        return 0, 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            mark_failed(email, error, now)
+        return 0, len(emails)
+    sent = failed = 0
+    try:
+        for email in emails:
+            try:
+                EmailMessage(
+                    email.subject, email.body, email.from_email,
+                    [email.recipient], connection=connection,
+                ).send()
+            except Exception as error:
+                mark_failed(email, error, now)
+                failed += 1
+                continue
+            finish(email, status=OutboxEmail.SENT, sent=timezone.now())
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
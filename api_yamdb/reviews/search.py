@@ -0,0 +1,176 @@
+"""Полнотекстовый поиск по названию и описанию произведений.
+
+На SQLite индекс хранится в виртуальной таблице FTS5, которую
+синхронизируют триггеры на `reviews_title`; запросы соединяют её с
+произведениями через модель TitleSearchIndex. На PostgreSQL используется
+GIN-индекс по выражению `to_tsvector`, обновляемый самой СУБД.
+На остальных СУБД поиск сводится к `icontains`.
+"""
+import re
+
+from django.db import connections, models
+from django.db.models import F, Func, Lookup, Q
+from django.db.utils import DatabaseError
+
+from reviews.models import Title
+
+SQLITE_TABLE = 'reviews_title_fts'
+
+SQLITE_SCHEMA = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5(
+        name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLE}_ai
+        AFTER INSERT ON reviews_title BEGIN
+        INSERT INTO {SQLITE_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLE}_ad
+        AFTER DELETE ON reviews_title BEGIN
+        INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLE}_au
+        AFTER UPDATE OF name, description ON reviews_title BEGIN
+        INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {SQLITE_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    f"INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}) VALUES ('rebuild')",
+)
+
+POSTGRES_CONFIG = 'russian'
+POSTGRES_VECTOR = (
+    f"to_tsvector('{POSTGRES_CONFIG}', "
+    "coalesce({name}, '') || ' ' || coalesce({description}, ''))"
+)
+POSTGRES_SCHEMA = (
+    'CREATE INDEX IF NOT EXISTS reviews_title_search_idx '
+    'ON reviews_title USING GIN ({})'.format(
+        POSTGRES_VECTOR.format(name='name', description='description')
+    ),
+)
+
+WORD_RE = re.compile(r'\w+')
+
+_installed = set()
+
+
+def install_search_index(using='default', **kwargs):
+    """Создаёт поисковый индекс; вызывается по сигналу `post_migrate`."""
+    connection = connections[using]
+    schema = {
+        'sqlite': SQLITE_SCHEMA,
+        'postgresql': POSTGRES_SCHEMA,
+    }.get(connection.vendor, ())
+    try:
+        with connection.cursor() as cursor:
+            for statement in schema:
+                cursor.execute(statement)
+    except DatabaseError:
+        # SQLite собран без FTS5: остаётся поиск через icontains.
+        return
+    _installed.add(using)
+
+
+def is_installed(connection):
+    if connection.alias in _installed:
+        return True
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                'AND name = %s', [SQLITE_TABLE]
+            )
+            found = cursor.fetchone() is not None
+    else:
+        found = connection.vendor == 'postgresql'
+    if found:
+        _installed.add(connection.alias)
+    return found
+
+
+class SearchVectorField(models.TextField):
+    """Тип `tsvector`; только у него есть лукап `search_match`."""
+
+
+class SearchVector(Func):
+    """Выражение, по которому построен GIN-индекс PostgreSQL."""
+
+    output_field = SearchVectorField()
+
+    def __init__(self):
+        super().__init__(F('name'), F('description'))
+
+    def as_postgresql(self, compiler, connection):
+        name, name_params = compiler.compile(self.source_expressions[0])
+        description, description_params = compiler.compile(
+            self.source_expressions[1]
+        )
+        return (
+            POSTGRES_VECTOR.format(name=name, description=description),
+            [*name_params, *description_params]
+        )
+
+
+@SearchVectorField.register_lookup
+class SearchMatch(Lookup):
+    """Лукап `search_vector__search_match`: документ подходит к запросу."""
+
+    lookup_name = 'search_match'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return (
+            f"{lhs} @@ plainto_tsquery('{POSTGRES_CONFIG}', {rhs})",
+            lhs_params + rhs_params
+        )
+
+
+class SearchRank(Func):
+    """Релевантность произведения запросу (PostgreSQL), для сортировки."""
+
+    output_field = models.FloatField()
+
+    def __init__(self, query):
+        super().__init__(SearchVector())
+        self.query = query
+
+    def as_postgresql(self, compiler, connection):
+        vector, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"ts_rank({vector}, plainto_tsquery('{POSTGRES_CONFIG}', %s))",
+            [*params, self.query]
+        )
+
+
+def search_titles(queryset, query):
+    """Фильтрует произведения по запросу и сортирует по релевантности."""
+    words = WORD_RE.findall(query)
+    if not words:
+        return queryset.none()
+    connection = connections[queryset.db]
+    if not is_installed(connection):
+        condition = Q()
+        for word in words:
+            condition &= (
+                Q(name__icontains=word) | Q(description__icontains=word)
+            )
+        return queryset.filter(condition)
+    if connection.vendor == 'sqlite':
+        # FTS5 не знает русской морфологии: словоформы ищутся по префиксу.
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.filter(search_index__query=match).order_by(
+            'search_index__rank'
+        )
+    found = Title.objects.annotate(search_vector=SearchVector()).filter(
+        search_vector__search_match=query
+    )
+    return queryset.filter(pk__in=found.values('pk')).order_by(
+        SearchRank(query).desc()
+    )
@@ -0,0 +1,112 @@
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+
+from api.serializers import ReviewSerializer
+from api.views import ReviewViewSet
+from reviews.models import Review, Title
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    def get_rating(self, client, title_id):
+        response = client.get(f'/api/v1/titles/{title_id}/')
+        assert response.status_code == HTTPStatus.OK
+        return response.json().get('rating')
+
+    def test_01_rating_follows_review_changes(self, admin_client, admin,
+                                              user, user_client, moderator,
+                                              moderator_client):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        assert self.get_rating(admin_client, title_id) == 5, (
+            'Проверьте, что рейтинг произведения равен средней оценке '
+            'оставленных отзывов.'
+        )
+
+        response = user_client.patch(
+            f'{url}{reviews[1]["id"]}/', data={'score': 8}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(admin_client, title_id) == 6, (
+            'Проверьте, что изменение оценки в отзыве пересчитывает рейтинг '
+            'произведения.'
+        )
+
+        response = user_client.delete(f'{url}{reviews[1]["id"]}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(admin_client, title_id) == 5, (
+            'Проверьте, что удаление отзыва пересчитывает рейтинг '
+            'произведения.'
+        )
+
+        for review in reviews[::2]:
+            admin_client.delete(f'{url}{review["id"]}/')
+        assert self.get_rating(admin_client, title_id) is None, (
+            'Проверьте, что у произведения без отзывов значение поля '
+            '`rating` равно `None`.'
+        )
+
+    def test_02_rating_after_user_delete(self, admin_client, admin, user,
+                                         user_client, moderator,
+                                         moderator_client):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        user_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{reviews[1]["id"]}/',
+            data={'score': 8}
+        )
+
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(admin_client, title_id) == 5, (
+            'Проверьте, что при удалении пользователя рейтинг произведений '
+            'пересчитывается без его отзывов.'
+        )
+
+    def test_03_concurrent_review_changes(self, admin_client, admin, user,
+                                          user_client):
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        view = ReviewViewSet()
+        # Параллельные запросы прочитали отзыв до изменений друг друга.
+        first, second = (
+            Review.objects.get(pk=reviews[0]['id']) for _ in range(2)
+        )
+        for review, score in ((first, 9), (second, 1)):
+            serializer = ReviewSerializer(
+                review, data={'score': score}, partial=True,
+                context={'request': SimpleNamespace(method='PATCH')}
+            )
+            serializer.is_valid(raise_exception=True)
+            view.perform_update(serializer)
+        assert self.get_rating(admin_client, titles[0]['id']) == 3, (
+            'Проверьте, что изменение оценки сдвигает сумму оценок от '
+            'текущего значения в базе, а не от прочитанного ранее.'
+        )
+
+        first, second = (
+            Review.objects.get(pk=reviews[0]['id']) for _ in range(2)
+        )
+        view.perform_destroy(first)
+        view.perform_destroy(second)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.reviews_count, title.score_sum) == (1, 5), (
+            'Проверьте, что повторное удаление отзыва не уменьшает '
+            'счётчики произведения второй раз.'
+        )
@@ -0,0 +1,86 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import PageNumberPagination
+
+from api.reference import ReferenceData, reference_data
+from reviews.models import Category, Genre, Title
+
+
+def create_catalogue(size):
+    category = Category.objects.create(name='Фильм', slug='films')
+    genres = [
+        Genre.objects.create(name='Ужасы', slug='horror'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {idx}', year=2000, category=category)
+        for idx in range(size)
+    )
+    titles = Title.objects.all()
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+        for title in titles for genre in genres
+    )
+    for model in (Category, Genre):
+        reference_data(model).get()
+    return titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09TitleQueries:
+
+    @pytest.fixture(autouse=True)
+    def disable_response_cache(self, settings):
+        settings.RESPONSE_CACHE_TIMEOUT = 0
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    def test_01_title_list_queries(self, client, monkeypatch):
+        create_catalogue(100)
+        url = '/api/v1/titles/'
+
+        monkeypatch.setattr(PageNumberPagination, 'page_size', 10)
+        small_page = self.count_queries(client, url)
+        monkeypatch.setattr(PageNumberPagination, 'page_size', 100)
+        large_page = self.count_queries(client, url)
+
+        assert small_page == large_page, (
+            f'Проверьте, что количество SQL-запросов к `{url}` не зависит '
+            f'от размера страницы: {small_page} запросов на 10 объектов, '
+            f'{large_page} на 100.'
+        )
+
+    def test_02_title_detail_queries(self, client):
+        titles = create_catalogue(2)
+        url = f'/api/v1/titles/{titles[0].pk}/'
+        assert self.count_queries(client, url) == 2, (
+            f'Проверьте, что GET-запрос к `{url}` берёт категорию и жанры '
+            'из снимков справочников, а связи с жанрами загружает одним '
+            'отдельным запросом.'
+        )
+
+    def test_03_reference_version_once_per_request(self, client,
+                                                   monkeypatch):
+        create_catalogue(30)
+        calls = []
+        current_version = ReferenceData.current_version
+
+        def counting_current_version(reference):
+            calls.append(reference.model)
+            return current_version(reference)
+
+        monkeypatch.setattr(
+            ReferenceData, 'current_version', counting_current_version
+        )
+        client.get('/api/v1/titles/')
+        assert sorted(model.__name__ for model in calls) == [
+            'Category', 'Genre'
+        ], (
+            'Проверьте, что версия снимка справочника запрашивается из кеша '
+            'один раз на запрос, а не для каждого произведения.'
+        )
@@ -0,0 +1,51 @@
+import pytest
+from rest_framework.pagination import CursorPagination
+
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10CursorPagination:
+
+    def collect_pages(self, client, url, monkeypatch):
+        monkeypatch.setattr(CursorPagination, 'page_size', 2)
+        results = []
+        response = client.get(url, {'pagination': 'cursor'})
+        while True:
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data, (
+                f'Проверьте, что в курсорном режиме `{url}` не считает '
+                'общее количество объектов.'
+            )
+            results.extend(data['results'])
+            if not data['next']:
+                return results
+            response = client.get(data['next'])
+
+    def test_01_reviews_and_comments_cursor(self, admin_client, admin, user,
+                                            user_client, moderator,
+                                            moderator_client, monkeypatch):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        title_id = titles[0]['id']
+        urls = (
+            (f'/api/v1/titles/{title_id}/reviews/', reviews),
+            (
+                f'/api/v1/titles/{title_id}/reviews/{reviews[0]["id"]}/'
+                'comments/',
+                comments
+            ),
+        )
+        for url, objects in urls:
+            results = self.collect_pages(admin_client, url, monkeypatch)
+            assert [obj['id'] for obj in results] == [
+                obj['id'] for obj in reversed(objects)
+            ], (
+                f'Проверьте, что курсорная пагинация `{url}` отдаёт все '
+                'объекты от новых к старым без пропусков и повторов.'
+            )
@@ -0,0 +1,74 @@
+import pytest
+from django.db.models import AutoField
+
+from reviews.models import Category, Title
+from reviews.search import search_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleSearch:
+    url = '/api/v1/titles/'
+
+    def search(self, client, query):
+        response = client.get(self.url, {'search': query})
+        assert response.status_code == 200
+        return [title['name'] for title in response.json()['results']]
+
+    def test_01_search_titles(self, client):
+        category = Category.objects.create(name='Книги', slug='books')
+        Title.objects.create(
+            name='Война и мир', year=1869, category=category,
+            description='Роман-эпопея о войне 1812 года.'
+        )
+        Title.objects.create(
+            name='Мастер и Маргарита', year=1967, category=category,
+            description='Роман о визите дьявола в Москву.'
+        )
+        title = Title.objects.create(
+            name='Записки охотника', year=1852, category=category,
+            description='Цикл рассказов.'
+        )
+
+        assert self.search(client, 'войн') == ['Война и мир'], (
+            f'Проверьте, что параметр `search` в `{self.url}` ищет по '
+            'началу слов в названии и описании произведения.'
+        )
+        assert set(self.search(client, 'роман')) == {
+            'Война и мир', 'Мастер и Маргарита'
+        }, (
+            f'Проверьте, что параметр `search` в `{self.url}` ищет '
+            'по описанию произведения.'
+        )
+        assert self.search(client, 'роман москву') == [
+            'Мастер и Маргарита'
+        ]
+
+        title.name = 'Охота на овец'
+        title.save()
+        assert self.search(client, 'записки') == [], (
+            'Проверьте, что поисковый индекс обновляется при изменении '
+            'произведения.'
+        )
+        assert self.search(client, 'овец') == ['Охота на овец']
+
+        title.delete()
+        assert self.search(client, 'овец') == [], (
+            'Проверьте, что поисковый индекс обновляется при удалении '
+            'произведения.'
+        )
+
+    def test_02_search_joins_index_once(self):
+        Title.objects.create(name='Война и мир', year=1869)
+        Title.objects.create(name='Мир', year=2000, description='Война.')
+        queryset = search_titles(Title.objects.all(), 'война')
+        sql = str(queryset.query)
+        assert 'JOIN "reviews_title_fts"' in sql
+        assert 'SELECT rank' not in sql, (
+            'Проверьте, что релевантность берётся из соединения с '
+            'индексом, а не из подзапроса для каждой строки.'
+        )
+        assert len(queryset) == 2
+        assert 'search_match' not in AutoField.get_lookups(), (
+            'Проверьте, что лукап поиска не регистрируется на всех '
+            'AutoField проекта.'
+        )
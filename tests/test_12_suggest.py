@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from api.suggest import index
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12Suggest:
+    url = '/api/v1/suggest/'
+
+    @pytest.fixture(autouse=True)
+    def clear_index(self):
+        index.clear()
+
+    def test_01_suggest(self, client, django_assert_num_queries):
+        category = Category.objects.create(name='Фильм', slug='films')
+        Genre.objects.create(name='Мюзикл', slug='musical')
+        title = Title.objects.create(
+            name='Мост через реку Квай', year=1957, category=category
+        )
+        Title.objects.create(name='Мастер и Маргарита', year=1994)
+
+        response = client.get(self.url, {'q': 'м'})
+        assert response.status_code == 200, (
+            f'Эндпоинт `{self.url}` не найден или недоступен анониму.'
+        )
+        assert [item['name'] for item in response.json()] == [
+            'Мастер и Маргарита', 'Мост через реку Квай', 'Мюзикл'
+        ]
+
+        with django_assert_num_queries(0):
+            response = client.get(self.url, {'q': 'реку', 'type': 'titles'})
+        assert response.json() == [
+            {'type': 'titles', 'id': title.pk, 'name': title.name}
+        ], (
+            f'Проверьте, что `{self.url}` находит произведение по началу '
+            'любого слова в названии, не обращаясь к базе.'
+        )
+
+        title.name = 'Мост слишком далеко'
+        title.save()
+        Genre.objects.filter(slug='musical').delete()
+        category.delete()
+        response = client.get(self.url, {'q': 'м', 'limit': 5})
+        assert [item['name'] for item in response.json()] == [
+            'Мастер и Маргарита', 'Мост слишком далеко'
+        ], (
+            f'Проверьте, что индекс `{self.url}` обновляется при изменении '
+            'и удалении объектов.'
+        )
+
+    def test_02_suggest_bad_params(self, client):
+        assert client.get(self.url, {'q': 'м', 'limit': 'x'}).status_code \
+            == 400
+        assert client.get(self.url, {'q': 'м', 'type': 'x'}).status_code \
+            == 400
+
+    def test_03_stale_index_rebuilt_in_background(
+        self, client, settings, django_assert_num_queries
+    ):
+        title = Title.objects.create(name='Мост', year=1957)
+        client.get(self.url, {'q': 'м'})
+        Title.objects.filter(pk=title.pk).update(name='Мастер')
+        index.built_at -= settings.SUGGEST_INDEX_TTL + 1
+
+        with django_assert_num_queries(0):
+            response = client.get(self.url, {'q': 'м'})
+        assert [item['name'] for item in response.json()] == ['Мост'], (
+            'Проверьте, что устаревший индекс отвечает сразу, а '
+            'перестраивается в фоне.'
+        )
+        for _ in range(100):
+            if index.changes is None and not index.is_stale():
+                break
+            time.sleep(0.05)
+        response = client.get(self.url, {'q': 'м'})
+        assert [item['name'] for item in response.json()] == ['Мастер']
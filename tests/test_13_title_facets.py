@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13TitleFacets:
+    url = '/api/v1/titles/'
+
+    def test_01_facets(self, admin_client, client):
+        create_titles(admin_client)
+
+        response = client.get(self.url, {'facets': 'genre,category,year'})
+        assert response.status_code == 200
+        facets = response.json().get('facets')
+        assert facets == {
+            'genre': [
+                {'slug': 'comedy', 'name': 'Комедия', 'count': 1},
+                {'slug': 'drama', 'name': 'Драма', 'count': 1},
+                {'slug': 'horror', 'name': 'Ужасы', 'count': 1},
+            ],
+            'category': [
+                {'slug': 'books', 'name': 'Книги', 'count': 1},
+                {'slug': 'films', 'name': 'Фильм', 'count': 1},
+            ],
+            'year': [
+                {'year': 1984, 'count': 1},
+                {'year': 1988, 'count': 1},
+            ],
+        }, (
+            f'Проверьте, что при GET-запросе к `{self.url}` с параметром '
+            '`facets` ответ содержит количество произведений по каждому '
+            'значению фасета.'
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                self.url, {'facets': 'genre,year', 'category': 'films'}
+            )
+        assert response.json()['facets'] == {
+            'genre': [
+                {'slug': 'comedy', 'name': 'Комедия', 'count': 1},
+                {'slug': 'horror', 'name': 'Ужасы', 'count': 1},
+            ],
+            'year': [{'year': 1984, 'count': 1}],
+        }, (
+            'Проверьте, что фасеты считаются с учётом текущих фильтров.'
+        )
+        assert len(context.captured_queries) == 5, (
+            'Проверьте, что каждый фасет считается одним запросом.'
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.url, {'facets': 'rating'})
+        assert response.status_code == 400
+        assert not any(
+            'reviews_title' in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что фасеты проверяются до выборки произведений.'
+
+    def test_02_facets_with_response_cache(self, admin_client, client,
+                                           settings):
+        settings.RESPONSE_CACHE_ENABLED = True
+        create_titles(admin_client)
+        params = {'facets': 'genre'}
+        response = client.get(self.url, params)
+        assert response.json()['facets']['genre']
+        response = client.get(
+            self.url, params, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert response.status_code == 304, (
+            'Проверьте, что запрос с фасетами и совпавшим `If-None-Match` '
+            'получает ответ со статусом 304.'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.url, params)
+        assert response.json()['facets']['genre'], (
+            'Проверьте, что фасеты кешируются вместе со страницей.'
+        )
+        assert not context.captured_queries
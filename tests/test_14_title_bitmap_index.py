@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from api.bitmaps import index
+from reviews.models import Title
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14TitleBitmapIndex:
+    url = '/api/v1/titles/'
+    filters = (
+        {},
+        {'genre': 'horror'},
+        {'genre': 'drama'},
+        {'category': 'films'},
+        {'genre': 'comedy', 'category': 'films', 'year': 1984},
+        {'genre': 'comedy', 'category': 'books'},
+        {'genre': 'unknown'},
+        {'year': 1988},
+    )
+
+    @pytest.fixture(autouse=True)
+    def clear_index(self):
+        index.clear()
+
+    def get_names(self, client, params):
+        response = client.get(self.url, params)
+        assert response.status_code == 200
+        data = response.json()
+        return data['count'], [title['name'] for title in data['results']]
+
+    def check_filters(self, client, settings):
+        for params in self.filters:
+            settings.TITLE_BITMAP_INDEX = False
+            expected = self.get_names(client, params)
+            settings.TITLE_BITMAP_INDEX = True
+            assert self.get_names(client, params) == expected, (
+                f'Проверьте, что битовый индекс для `{self.url}` с '
+                f'фильтрами {params} даёт тот же результат, что и SQL.'
+            )
+
+    def test_01_bitmap_filters(self, admin_client, client, settings):
+        titles, _, _ = create_titles(admin_client)
+        settings.TITLE_BITMAP_INDEX = True
+        self.check_filters(client, settings)
+
+        response = admin_client.post(self.url, data={
+            'name': 'Абырвалг', 'year': 1988, 'genre': ['horror', 'drama'],
+            'category': 'films'
+        })
+        assert response.status_code == 201
+        admin_client.patch(f'{self.url}{titles[0]["id"]}/', data={
+            'name': 'Яблоко', 'genre': ['drama'], 'category': 'books'
+        })
+        admin_client.delete(f'{self.url}{titles[1]["id"]}/')
+        admin_client.delete('/api/v1/genres/horror/')
+        self.check_filters(client, settings)
+
+    def test_02_bits_by_pk(self, admin_client, client, settings):
+        titles, _, _ = create_titles(admin_client)
+        settings.TITLE_BITMAP_INDEX = True
+        settings.TITLE_BITMAP_MAX_IDS = 1
+        self.check_filters(client, settings)
+
+        settings.TITLE_BITMAP_MAX_IDS = 1000
+        index.build()
+        title = titles[0]
+        bitmaps = dict(index.years)
+        admin_client.patch(f'{self.url}{title["id"]}/', data={'name': 'А'})
+        assert index.years == bitmaps, (
+            'Проверьте, что переименование произведения не сдвигает биты '
+            'других произведений.'
+        )
+        assert index.years[title['year']] >> title['id'] & 1
+        self.check_filters(client, settings)
+
+    def test_03_stale_index_rebuilt_in_background(
+        self, admin_client, client, settings, monkeypatch
+    ):
+        titles, _, _ = create_titles(admin_client)
+        settings.TITLE_BITMAP_INDEX = True
+        params = {'year': titles[0]['year']}
+        expected = self.get_names(client, params)
+        Title.objects.filter(pk=titles[0]['id']).update(year=1000)
+        index.built_at -= settings.TITLE_BITMAP_INDEX_TTL + 1
+
+        release, builds = threading.Event(), []
+        build = index.build
+
+        def slow_build():
+            builds.append(1)
+            release.wait(5)
+            build()
+
+        monkeypatch.setattr(index, 'build', slow_build)
+        for _ in range(3):
+            assert self.get_names(client, params) == expected, (
+                'Проверьте, что устаревший битовый индекс отвечает сразу, '
+                'а перестраивается в фоне.'
+            )
+        # Изменение во время перестройки не должно потеряться.
+        admin_client.patch(
+            f'{self.url}{titles[1]["id"]}/', data={'year': 1000}
+        )
+        release.set()
+        for _ in range(100):
+            if index.changes is None and not index.is_stale():
+                break
+            time.sleep(0.05)
+        assert len(builds) == 1, (
+            'Проверьте, что устаревший битовый индекс перестраивает только '
+            'один поток.'
+        )
+        self.check_filters(client, settings)
+        settings.TITLE_BITMAP_INDEX = False
+        expected = self.get_names(client, {'year': 1000})
+        settings.TITLE_BITMAP_INDEX = True
+        assert self.get_names(client, {'year': 1000}) == expected
+        assert expected[0] == 2
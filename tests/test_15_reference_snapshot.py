@@ -0,0 +1,54 @@
+import pytest
+
+from reviews.models import Genre
+from tests.utils import create_categories, create_genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15ReferenceSnapshot:
+
+    def test_01_reference_lists_without_queries(
+            self, admin_client, client, django_assert_num_queries):
+        categories = create_categories(admin_client)
+        genres = create_genre(admin_client)
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/genres/')
+
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/categories/')
+            client.get('/api/v1/genres/')
+        assert response.json()['count'] == len(categories), (
+            'Проверьте, что список категорий отдаётся из снимка '
+            'справочника без запросов к базе.'
+        )
+
+        admin_client.delete(f'/api/v1/genres/{genres[0]["slug"]}/')
+        response = client.get('/api/v1/genres/', {'search': 'Ком'})
+        assert response.json()['results'] == [genres[1]], (
+            'Проверьте, что снимок справочника обновляется после записи и '
+            'поддерживает параметр `search`.'
+        )
+
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Поезд', 'year': 2000, 'genre': [genres[0]['slug']],
+            'category': categories[0]['slug']
+        })
+        assert response.status_code == 400, (
+            'Проверьте, что slug удалённого жанра не принимается.'
+        )
+
+    def test_02_snapshot_expires_without_signal(
+            self, admin_client, client, settings):
+        create_genre(admin_client)
+        client.get('/api/v1/genres/')
+        # Запись из другого процесса: сигнал сюда не доходит.
+        Genre.objects.bulk_create([Genre(name='Мюзикл', slug='musical')])
+
+        response = client.get('/api/v1/genres/', {'search': 'Мюзикл'})
+        assert response.json()['count'] == 0
+        settings.REFERENCE_SNAPSHOT_MAX_AGE = 0
+        response = client.get('/api/v1/genres/', {'search': 'Мюзикл'})
+        assert response.json()['count'] == 1, (
+            'Проверьте, что снимок справочника старше '
+            '`REFERENCE_SNAPSHOT_MAX_AGE` перечитывается из базы.'
+        )
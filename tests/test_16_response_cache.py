@@ -0,0 +1,144 @@
+import time
+
+import pytest
+from django.db import transaction
+from django.test import RequestFactory
+
+from api import cache
+from api.views import TitleViewSet
+from reviews.models import Title
+from tests.utils import create_reviews, create_single_review, create_titles
+
+
+@pytest.fixture(autouse=True)
+def enable_response_cache(settings):
+    # В тестах один процесс, кеш в памяти ему подходит.
+    settings.RESPONSE_CACHE_ENABLED = True
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16ResponseCache:
+
+    def test_01_cached_reads_are_invalidated(
+            self, admin_client, admin, user, user_client, moderator,
+            moderator_client, client, django_assert_num_queries):
+        author_map = {admin: admin_client, user: user_client}
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f'{title_url}reviews/'
+        other_title_url = f'/api/v1/titles/{titles[1]["id"]}/'
+
+        for url in (title_url, reviews_url, other_title_url):
+            client.get(url)
+        with django_assert_num_queries(0):
+            assert client.get(title_url).json()['rating'] == 5
+            assert client.get(reviews_url).json()['count'] == 2
+            client.get(other_title_url)
+
+        create_single_review(moderator_client, titles[0]['id'], 'text', 8)
+        assert client.get(title_url).json()['rating'] == 6, (
+            'Проверьте, что новый отзыв сбрасывает кеш ответа с рейтингом '
+            'произведения.'
+        )
+        assert client.get(reviews_url).json()['count'] == 3, (
+            'Проверьте, что новый отзыв сбрасывает кеш списка отзывов.'
+        )
+        with django_assert_num_queries(0):
+            client.get(other_title_url)
+
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'username': 'renamed'}
+        )
+        authors = {
+            review['author']
+            for review in client.get(reviews_url).json()['results']
+        }
+        assert 'renamed' in authors, (
+            'Проверьте, что изменение пользователя сбрасывает кеш ответов '
+            'с его отзывами.'
+        )
+
+    def test_02_conditional_get(self, admin_client, admin, user, user_client,
+                                client, django_assert_num_queries):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        urls = (
+            f'/api/v1/titles/{titles[0]["id"]}/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+            'comments/',
+        )
+        for url in urls:
+            client.get(url)
+        # Last-Modified отдаётся только для версий из прошедших секунд.
+        time.sleep(1)
+        for url in urls:
+            response = client.get(url)
+            etag = response.get('ETag')
+            last_modified = response.get('Last-Modified')
+            assert etag and last_modified, (
+                f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+                'заголовки `ETag` и `Last-Modified`.'
+            )
+            with django_assert_num_queries(0):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304, (
+                f'Проверьте, что GET-запрос к `{url}` с совпавшим '
+                '`If-None-Match` получает ответ со статусом 304.'
+            )
+            response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            assert response.status_code == 304
+
+        etag = client.get(urls[0])['ETag']
+        create_single_review(user_client, titles[0]['id'], 'text', 1)
+        response = client.get(urls[0], HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после нового отзыва ETag произведения меняется.'
+        )
+
+    def test_03_disabled_with_process_local_cache(
+            self, admin_client, client, settings):
+        settings.RESPONSE_CACHE_ENABLED = None
+        titles = create_titles(admin_client)[0]
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.status_code == 200
+        assert 'ETag' not in response, (
+            'Проверьте, что с кешем в памяти процесса кеш ответов по '
+            'умолчанию выключен.'
+        )
+
+    def test_04_no_last_modified_in_current_second(
+            self, admin_client, admin, client):
+        titles = create_titles(admin_client)[0]
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        client.get(url)
+        time.sleep(1)
+        last_modified = client.get(url)['Last-Modified']
+        create_single_review(admin_client, titles[0]['id'], 'text', 1)
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 200, (
+            'Проверьте, что запись в ту же секунду, что и прошлый ответ, '
+            'не даёт ответа 304 по `If-Modified-Since`.'
+        )
+
+    def test_05_invalidated_again_after_commit(self, admin_client, client):
+        titles = create_titles(admin_client)[0]
+        url = '/api/v1/titles/'
+        stale = client.get(url).json()
+        with transaction.atomic():
+            title = Title.objects.get(pk=titles[0]['id'])
+            title.name = 'Новое название'
+            title.save()
+            # Параллельный запрос ещё видит старые строки и кеширует их
+            # под уже сброшенными версиями тегов.
+            key = cache.make_key(RequestFactory().get(url))
+            versions = cache.tag_versions(TitleViewSet.cache_list_tags)
+            cache.set_response_data(key, stale, versions)
+
+        names = {
+            result['id']: result['name']
+            for result in client.get(url).json()['results']
+        }
+        assert names[titles[0]['id']] == 'Новое название', (
+            'Проверьте, что версии тегов сбрасываются и после коммита '
+            'транзакции, а не только при записи.'
+        )
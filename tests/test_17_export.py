@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+
+import pytest
+
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17Export:
+    url = '/api/v1/export/titles/'
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_01_export(self, admin_client, admin, user, user_client):
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+
+        response = admin_client.get(self.url, {'reviews': '1'})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        exported = [json.loads(line) for line in
+                    self.read(response).splitlines()]
+        assert [title['id'] for title in exported] == sorted(
+            title['id'] for title in titles
+        )
+        first = exported[0]
+        assert first['category'] == {'name': 'Фильм', 'slug': 'films'}
+        assert first['genre'] == [
+            {'name': 'Комедия', 'slug': 'comedy'},
+            {'name': 'Ужасы', 'slug': 'horror'},
+        ]
+        assert first['rating'] == 5
+        assert {review['id'] for review in first['reviews']} == {
+            review['id'] for review in reviews
+        }, (
+            f'Проверьте, что `{self.url}?reviews=1` выгружает отзывы '
+            'вместе с произведением.'
+        )
+        assert exported[1]['reviews'] == []
+
+        response = admin_client.get(self.url, {'output': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        assert len(rows) == len(titles)
+        assert rows[0]['genre'] == 'comedy|horror'
+        assert rows[1]['category'] == 'books'
+
+        assert admin_client.get(
+            self.url, {'output': 'xml'}
+        ).status_code == 400
+        assert user_client.get(self.url).status_code == 403, (
+            f'Проверьте, что `{self.url}` доступен только администратору.'
+        )
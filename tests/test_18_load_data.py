@@ -0,0 +1,156 @@
+import csv
+import io
+import os
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Avg
+
+from reviews.management.commands.dump_data import COLUMNS
+from reviews.models import (Category, Comment, CustomUser, Genre,
+                            ImportCheckpoint, Review, Title)
+from tests.conftest import MANAGE_PATH
+
+DATA_DIR = os.path.join(MANAGE_PATH, 'static', 'data')
+
+
+def count_rows(filename):
+    with open(os.path.join(DATA_DIR, filename), encoding='utf-8') as file:
+        return sum(1 for _ in csv.DictReader(file))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18LoadData:
+
+    def test_01_load_data(self):
+        call_command('load_data', batch_size=7, stdout=io.StringIO())
+
+        for model, filename in (
+            (CustomUser, 'users.csv'),
+            (Category, 'category.csv'),
+            (Genre, 'genre.csv'),
+            (Title, 'titles.csv'),
+            (Title.genre.through, 'genre_title.csv'),
+            (Review, 'review.csv'),
+            (Comment, 'comments.csv'),
+        ):
+            assert model.objects.count() == count_rows(filename), (
+                f'Проверьте, что команда `load_data` загружает все строки '
+                f'из `{filename}`.'
+            )
+
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.isoformat().startswith('2019-09-24T21:08:21')
+        assert review.author.username == 'bingobongo'
+        title = Title.objects.get(pk=1)
+        assert title.genre.exists(), (
+            'Проверьте, что `load_data` загружает жанры произведений из '
+            '`genre_title.csv`.'
+        )
+        assert title.rating == title.reviews.aggregate(
+            rating=Avg('score')
+        )['rating']
+
+    def test_02_upsert_resumes_from_checkpoint(self):
+        call_command('load_data', upsert=True, batch_size=10,
+                     stdout=io.StringIO())
+        call_command('load_data', upsert=True, stdout=io.StringIO())
+        assert Title.objects.count() == count_rows('titles.csv'), (
+            'Проверьте, что повторный запуск `load_data --upsert` не '
+            'создаёт дубликатов и не падает на существующих строках.'
+        )
+
+        Title.objects.filter(pk__in=(1, 20)).update(name='Изменено')
+        Title.objects.filter(pk=31).delete()
+        with open(os.path.join(DATA_DIR, 'titles.csv'), 'rb') as file:
+            # Заголовок и первые 10 строк.
+            offset = sum(len(file.readline()) for _ in range(11))
+        ImportCheckpoint.objects.filter(filename='titles.csv').update(
+            rows_done=10, offset=offset, completed=False
+        )
+        output = io.StringIO()
+        call_command('load_data', upsert=True, batch_size=10, stdout=output)
+
+        assert Title.objects.get(pk=1).name == 'Изменено', (
+            'Проверьте, что `load_data --upsert` продолжает загрузку с '
+            'сохранённой контрольной точки.'
+        )
+        assert Title.objects.get(pk=20).name != 'Изменено', (
+            'Проверьте, что `load_data --upsert` обновляет изменившиеся '
+            'строки.'
+        )
+        assert Title.objects.filter(pk=31).exists()
+        assert 'пропущено 10' in output.getvalue()
+        assert 'review.csv: без изменений' in output.getvalue()
+
+    def test_03_dump_data_round_trip(self, tmp_path):
+        call_command('load_data', stdout=io.StringIO())
+        for compress in (False, True):
+            path = tmp_path / ('gzip' if compress else 'plain')
+            call_command('dump_data', path=str(path), gzip=compress,
+                         stdout=io.StringIO())
+            suffix = '.gz' if compress else ''
+            assert (path / f'review.csv{suffix}').exists(), (
+                'Проверьте, что `dump_data` создаёт файлы в формате '
+                'static/data.'
+            )
+
+        with open(tmp_path / 'plain' / 'review.csv', encoding='utf-8') as f:
+            header = f.readline().strip()
+        assert header == 'id,title_id,text,author,score,pub_date'
+
+        expected = {
+            model: list(model.objects.order_by('pk').values_list(
+                *(model._meta.get_field(column).attname for column in columns)
+            ))
+            for model, columns in COLUMNS.items()
+        }
+        call_command('flush', interactive=False)
+        call_command('load_data', path=str(tmp_path / 'gzip'),
+                     stdout=io.StringIO())
+        for model, rows in expected.items():
+            assert list(model.objects.order_by('pk').values_list(
+                *(model._meta.get_field(column).attname
+                  for column in COLUMNS[model])
+            )) == rows, (
+                'Проверьте, что данные, выгруженные `dump_data`, '
+                'загружаются `load_data` без потерь.'
+            )
+
+    def test_04_generate_data(self):
+        options = dict(users=15, categories=3, genres=4, titles=20,
+                       reviews=250, comments=40, batch_size=33)
+        call_command('generate_data', stdout=io.StringIO(), **options)
+
+        for model, name in (
+            (CustomUser, 'users'), (Category, 'categories'),
+            (Genre, 'genres'), (Title, 'titles'), (Review, 'reviews'),
+            (Comment, 'comments'),
+        ):
+            assert model.objects.count() == options[name], (
+                f'Проверьте, что `generate_data` создаёт заданное '
+                f'количество объектов `{model.__name__}`.'
+            )
+        assert not Title.objects.filter(genre=None).exists()
+        title = Title.objects.order_by('-reviews_count').first()
+        assert title.reviews_count > 250 / 20
+        assert title.rating == title.reviews.aggregate(
+            rating=Avg('score')
+        )['rating']
+
+        first = list(Review.objects.order_by('pk').values_list(
+            'title_id', 'author_id', 'score'
+        ))
+        call_command('flush', interactive=False)
+        call_command('generate_data', stdout=io.StringIO(), **options)
+        assert list(Review.objects.order_by('pk').values_list(
+            'title_id', 'author_id', 'score'
+        )) == first, (
+            'Проверьте, что `generate_data` с одинаковым `--seed` создаёт '
+            'одинаковые данные.'
+        )
+
+    def test_05_dump_data_parallel_needs_snapshot(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command('dump_data', path=str(tmp_path), parallel=2,
+                         stdout=io.StringIO())
@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.management.commands.benchmark_api import (ENDPOINTS,
+                                                   find_regressions,
+                                                   percentile)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+
+
+def test_find_regressions():
+    baseline = {'titles-list': {
+        'p50': 10, 'p95': 20, 'p99': 30, 'queries': 3, 'bytes': 1000,
+    }}
+    same = dict(baseline['titles-list'])
+    assert not find_regressions(
+        'small', {'titles-list': same}, baseline, 0.5
+    )
+    worse = dict(same, queries=4, p95=40, bytes=2000)
+    regressions = find_regressions(
+        'small', {'titles-list': worse}, baseline, 0.5
+    )
+    assert len(regressions) == 2, (
+        'Проверьте, что без `--check-latency` задержка не сравнивается: '
+        'базовая линия могла быть записана на другой машине.'
+    )
+    regressions = find_regressions(
+        'small', {'titles-list': worse}, baseline, 0.5, latency=True
+    )
+    assert len(regressions) == 3, (
+        'Проверьте, что рост числа запросов, задержки и размера ответа '
+        'считается регрессией.'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_api(tmp_path):
+    baseline = tmp_path / 'endpoints.json'
+    call_command('benchmark_api', current_db=True, iterations=2, warmup=0,
+                 baseline=str(baseline), save_baseline=True,
+                 stdout=io.StringIO())
+    with open(baseline, encoding='utf-8') as file:
+        results = json.load(file)['small']
+    assert set(results) == {endpoint[0] for endpoint in ENDPOINTS}, (
+        'Проверьте, что `benchmark_api` замеряет все адреса API.'
+    )
+    assert results['titles-list']['queries'] > 0
+    assert results['titles-list']['bytes'] > 0
+
+    results['titles-list']['queries'] = 0
+    with open(baseline, 'w', encoding='utf-8') as file:
+        json.dump({'small': results}, file)
+    with pytest.raises(CommandError, match='titles-list'):
+        call_command('benchmark_api', current_db=True, iterations=2,
+                     warmup=0, endpoints='^titles-list$',
+                     baseline=str(baseline), stdout=io.StringIO())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_units(tmp_path):
+    history = tmp_path / 'units.jsonl'
+    for label in ('before', 'after'):
+        stdout = io.StringIO()
+        call_command('benchmark_units', current_db=True, min_time=0.001,
+                     repeat=1, history=str(history), label=label,
+                     stdout=stdout)
+    with open(history, encoding='utf-8') as file:
+        entries = [json.loads(line) for line in file]
+    assert [entry['label'] for entry in entries] == ['before', 'after'], (
+        'Проверьте, что `benchmark_units` дописывает результаты в историю.'
+    )
+    results = entries[-1]['results']
+    for name in ('TitleReadSerializer.to_representation',
+                 'CustomUserSerializer.is_valid', 'IsAdmin',
+                 'validate_username'):
+        assert results[name]['ops_per_sec'] > 0
+        assert results[name]['bytes_per_op'] >= 0
+    assert '%' in stdout.getvalue(), (
+        'Проверьте, что `benchmark_units` сравнивает результаты с '
+        'предыдущим замером.'
+    )
@@ -0,0 +1,66 @@
+import pytest
+
+from api.middleware import stats
+from tests.utils import create_reviews
+
+
+@pytest.fixture(autouse=True)
+def clear_stats():
+    stats.clear()
+    yield
+    stats.clear()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20QueryStats:
+
+    def test_01_headers(self, admin_client, admin, user, user_client,
+                        client, settings):
+        settings.RESPONSE_CACHE_TIMEOUT = 0
+        author_map = {admin: admin_client, user: user_client}
+        _, titles = create_reviews(admin_client, author_map)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        assert 'X-DB-Queries' not in response, (
+            'Проверьте, что заголовки со статистикой SQL-запросов не '
+            'отдаются анонимным пользователям без DEBUG.'
+        )
+        response = admin_client.get(url)
+        assert int(response['X-DB-Queries']) > 0, (
+            'Проверьте, что ответ содержит число SQL-запросов в заголовке '
+            '`X-DB-Queries`.'
+        )
+        # Авторы отзывов загружаются по одному: это повторы одного SQL.
+        assert int(response['X-DB-Duplicates']) >= 1, (
+            'Проверьте, что повторы одного SQL-запроса считаются в '
+            '`X-DB-Duplicates`.'
+        )
+        assert response['Server-Timing'].startswith('db;dur='), (
+            'Проверьте, что время SQL-запросов передаётся в заголовке '
+            '`Server-Timing`.'
+        )
+
+        settings.QUERY_STATS_HEADERS = True
+        assert 'X-DB-Queries' in client.get(url)
+        settings.QUERY_STATS_ENABLED = False
+        response = admin_client.get('/api/v1/titles/')
+        assert 'X-DB-Queries' not in response
+
+    def test_02_stats_endpoint(self, admin_client, user_client, client):
+        url = '/api/v1/stats/queries/'
+        assert client.get(url).status_code == 401
+        assert user_client.get(url).status_code == 403, (
+            'Проверьте, что статистика запросов доступна только '
+            'администратору.'
+        )
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        client.get('/api/v1/genres/')
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        views = {row['view']: row for row in response.json()}
+        assert views['TitleViewSet.list']['requests'] == 3, (
+            'Проверьте, что статистика собирается по вьюсетам и действиям.'
+        )
+        assert views['TitleViewSet.list']['queries_max'] >= 0
+        assert 'GenreViewSet.list' in views
@@ -0,0 +1,112 @@
+import json
+import re
+import subprocess
+import sys
+
+import pytest
+
+from api.metrics import registry
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics(settings):
+    settings.METRICS_DIR = None
+    settings.RESPONSE_CACHE_ENABLED = True
+    registry.clear()
+    yield
+    registry.clear()
+
+
+def sample(text, name, **labels):
+    """Значение метрики с заданными метками из ответа /metrics."""
+    for line in text.splitlines():
+        match = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+        if not match or match[1] != name:
+            continue
+        line_labels = dict(re.findall(r'(\w+)="([^"]*)"', match[2] or ''))
+        if all(line_labels.get(key) == value
+               for key, value in labels.items()):
+            return float(match[3])
+    return None
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21Metrics:
+
+    def test_01_metrics(self, client, admin_client):
+        for _ in range(2):
+            client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/100500/')
+        admin_client.post('/api/v1/categories/', data={
+            'name': 'Фильм', 'slug': 'films'
+        })
+
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        text = response.content.decode()
+        assert '# TYPE yamdb_http_request_duration_seconds histogram' in text
+        assert sample(text, 'yamdb_http_requests_total',
+                      view='TitleViewSet.list', method='GET',
+                      status='200') == 2, (
+            'Проверьте, что запросы считаются по вьюсетам и действиям.'
+        )
+        assert sample(text, 'yamdb_http_requests_total',
+                      view='TitleViewSet.retrieve', status='404') == 1
+        assert sample(text, 'yamdb_http_requests_total',
+                      view='CategoryViewSet.create', status='201') == 1
+        assert sample(text, 'yamdb_http_request_duration_seconds_count',
+                      view='TitleViewSet.list') == 2
+        assert sample(text, 'yamdb_http_request_duration_seconds_bucket',
+                      view='TitleViewSet.list', le='+Inf') == 2
+        assert sample(text, 'yamdb_db_queries_per_request_count',
+                      view='TitleViewSet.list') == 2, (
+            'Проверьте, что число SQL-запросов попадает в гистограмму.'
+        )
+        assert sample(text, 'yamdb_response_cache_total',
+                      result='hit') == 1
+        assert sample(text, 'yamdb_response_cache_hit_ratio') is not None
+
+    def test_02_shared_directory(self, client, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        other_worker = [[
+            'yamdb_http_requests_total',
+            [['method', 'GET'], ['status', 200],
+             ['view', 'TitleViewSet.list']],
+            5,
+        ]]
+        with open(tmp_path / '1-worker.json', 'w') as file:
+            json.dump(other_worker, file)
+        client.get('/api/v1/titles/')
+        text = client.get('/metrics').content.decode()
+        assert sample(text, 'yamdb_http_requests_total',
+                      view='TitleViewSet.list', status='200') == 6, (
+            'Проверьте, что `/metrics` суммирует значения всех процессов '
+            'из `METRICS_DIR`.'
+        )
+
+    def test_03_dead_worker_files_are_absorbed(self, client, settings,
+                                               tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+        worker.wait()
+        dead_worker = [[
+            'yamdb_http_requests_total',
+            [['method', 'GET'], ['status', 200],
+             ['view', 'TitleViewSet.list']],
+            5,
+        ]]
+        with open(tmp_path / f'{worker.pid}-worker.json', 'w') as file:
+            json.dump(dead_worker, file)
+        client.get('/api/v1/titles/')
+        for _ in range(2):
+            text = client.get('/metrics').content.decode()
+            assert sample(text, 'yamdb_http_requests_total',
+                          view='TitleViewSet.list', status='200') == 6, (
+                'Проверьте, что значения завершившегося процесса не '
+                'теряются и не считаются дважды.'
+            )
+        assert not (tmp_path / f'{worker.pid}-worker.json').exists(), (
+            'Проверьте, что файл метрик завершившегося процесса удаляется.'
+        )
+        assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,86 @@
+import os
+import pstats
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.profiling import prune_profiles
+from reviews.models import RequestProfile
+
+
+@pytest.fixture(autouse=True)
+def profiler_dir(settings, tmp_path):
+    settings.PROFILER_DIR = str(tmp_path)
+    settings.PROFILER_SAMPLE_RATE = 0
+    return tmp_path
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Profiler:
+
+    def test_01_admin_opt_in(self, admin_client, user_client, client,
+                             profiler_dir):
+        response = admin_client.get('/api/v1/titles/?profile=1')
+        assert response.status_code == 200
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        assert profile.view == 'TitleViewSet.list'
+        assert not profile.sampled
+        assert profile.duration_ms > 0
+        stats = pstats.Stats(str(profiler_dir / profile.filename))
+        assert stats.total_calls > 0, (
+            'Проверьте, что профиль запроса сохраняется в формате pstats.'
+        )
+
+        response = admin_client.get(
+            '/api/v1/genres/', HTTP_X_PROFILE='collapsed'
+        )
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        assert profile.filename.endswith('.collapsed')
+        assert (profiler_dir / profile.filename).exists()
+
+        for api_client in (user_client, client):
+            response = api_client.get('/api/v1/titles/?profile=1')
+            assert response.status_code == 200
+            assert 'X-Profile-Id' not in response, (
+                'Проверьте, что профилировать запрос может только '
+                'администратор.'
+            )
+        assert RequestProfile.objects.count() == 2
+
+    def test_02_sampling(self, client, settings):
+        settings.PROFILER_SAMPLE_RATE = 1
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/categories/')
+        profiles = RequestProfile.objects.all()
+        views = {profile.view for profile in profiles}
+        assert views == {'TitleViewSet.list', 'CategoryViewSet.list'}, (
+            'Проверьте, что при PROFILER_SAMPLE_RATE = 1 профилируется '
+            'каждый запрос.'
+        )
+        assert all(profile.sampled for profile in profiles)
+
+    def test_03_prune_profiles(self, client, settings, profiler_dir):
+        settings.PROFILER_SAMPLE_RATE = 1
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        first, second, third = RequestProfile.objects.order_by('pk')
+        RequestProfile.objects.filter(pk=second.pk).update(
+            created=timezone.now() - timedelta(days=30)
+        )
+        settings.PROFILER_MAX_AGE = 60 * 60 * 24
+
+        assert prune_profiles() == 1
+        assert not RequestProfile.objects.filter(pk=second.pk).exists(), (
+            'Проверьте, что `prune_profiles` удаляет профили старше '
+            '`PROFILER_MAX_AGE`.'
+        )
+        settings.PROFILER_MAX_PROFILES = 1
+        assert prune_profiles() == 1
+        assert list(RequestProfile.objects.all()) == [third], (
+            'Проверьте, что `prune_profiles` оставляет только '
+            '`PROFILER_MAX_PROFILES` последних профилей.'
+        )
+        assert os.listdir(profiler_dir) == [third.filename], (
+            'Проверьте, что вместе с профилем удаляется его файл.'
+        )
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+@pytest.fixture
+def trace_file(settings, tmp_path):
+    settings.TRACING_ENABLED = True
+    settings.TRACING_SAMPLE_RATE = 1
+    settings.TRACING_FILE = str(tmp_path / 'traces.jsonl')
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    return tmp_path / 'traces.jsonl'
+
+
+def read_spans(trace_file):
+    with open(trace_file, encoding='utf-8') as file:
+        traces = [json.loads(line) for line in file]
+    return [
+        [span for scope in trace['resourceSpans'][0]['scopeSpans']
+         for span in scope['spans']]
+        for trace in traces
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23Tracing:
+
+    def test_01_drf_stage_spans(self, client, trace_file):
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        spans = read_spans(trace_file)[-1]
+        assert response['X-Trace-Id'] == spans[0]['traceId']
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span['name'], span)
+        for stage in ('authentication', 'permissions', 'filter_queryset',
+                      'paginate_queryset', 'to_representation',
+                      'renderer', 'SELECT'):
+            assert stage in by_name, (
+                f'Проверьте, что трасса содержит спан `{stage}`.'
+            )
+        root = by_name['TitleViewSet.list']
+        assert root['kind'] == 2
+        assert 'parentSpanId' not in root
+        span_ids = {span['spanId'] for span in spans}
+        for span in spans:
+            if span is not root:
+                assert span['parentSpanId'] in span_ids, (
+                    'Проверьте, что спаны этапов вложены в корневой спан.'
+                )
+        select = by_name['SELECT']
+        attributes = {
+            attribute['key']: attribute['value'] for attribute
+            in select['attributes']
+        }
+        assert 'stringValue' in attributes['db.statement']
+        assert int(select['endTimeUnixNano']) >= int(
+            select['startTimeUnixNano']
+        )
+
+    def test_02_sampling(self, client, settings, trace_file):
+        settings.TRACING_SAMPLE_RATE = 0
+        response = client.get('/api/v1/genres/')
+        assert 'X-Trace-Id' not in response
+        assert not trace_file.exists(), (
+            'Проверьте, что запросы вне выборки не трассируются.'
+        )
+        client.get('/api/v1/genres/',
+                   HTTP_TRACEPARENT=f'00-{TRACE_ID}-{PARENT_ID}-01')
+        assert not trace_file.exists(), (
+            'Проверьте, что флаг sampled заголовка traceparent от '
+            'клиента не из `TRACING_TRUSTED_NETWORKS` не учитывается.'
+        )
+        settings.TRACING_TRUSTED_NETWORKS = ['127.0.0.0/8']
+        client.get('/api/v1/genres/',
+                   HTTP_TRACEPARENT=f'00-{TRACE_ID}-{PARENT_ID}-01')
+        client.get('/api/v1/genres/',
+                   HTTP_TRACEPARENT=f'00-{TRACE_ID}-{PARENT_ID}-00')
+        traces = read_spans(trace_file)
+        assert len(traces) == 1, (
+            'Проверьте, что флаг sampled заголовка traceparent учитывается.'
+        )
+        root = next(span for span in traces[0] if span['kind'] == 2)
+        assert root['traceId'] == TRACE_ID
+        assert root['parentSpanId'] == PARENT_ID
@@ -0,0 +1,86 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import ClaimsUser
+from tests.utils import create_titles
+
+
+def claims_client(django_user_model, username, role):
+    django_user_model.objects.create_user(
+        username=username, email=f'{username}@yamdb.fake', role=role,
+        confirmation_code='code'
+    )
+    response = APIClient().post('/api/v1/auth/token/', data={
+        'username': username, 'confirmation_code': 'code'
+    })
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+    return client
+
+
+def user_queries(queries):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if 'reviews_customuser' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24ClaimsAuth:
+
+    def test_01_no_user_query(self, django_user_model):
+        admin_client = claims_client(django_user_model, 'claims_admin',
+                                     'admin')
+        admin_client.post('/api/v1/genres/', data={
+            'name': 'Драма', 'slug': 'drama'
+        })
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.post('/api/v1/genres/', data={
+                'name': 'Комедия', 'slug': 'comedy'
+            })
+        assert response.status_code == 201
+        assert not user_queries(queries), (
+            'Проверьте, что пользователь из токена с ролью не загружается '
+            'из базы.'
+        )
+
+    def test_02_review_author(self, django_user_model, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        client = claims_client(django_user_model, 'claims_user', 'user')
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.post(url, data={'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == 'claims_user'
+        response = client.post(url, data={'text': 'Ещё', 'score': 3})
+        assert response.status_code == 400
+        me = client.get('/api/v1/users/me/').json()
+        assert me['email'] == 'claims_user@yamdb.fake'
+
+    def test_03_demotion(self, django_user_model, admin_client):
+        client = claims_client(django_user_model, 'demoted', 'admin')
+        assert client.post('/api/v1/genres/', data={
+            'name': 'Драма', 'slug': 'drama'
+        }).status_code == 201
+        admin_client.patch('/api/v1/users/demoted/', data={'role': 'user'})
+        assert client.post('/api/v1/genres/', data={
+            'name': 'Комедия', 'slug': 'comedy'
+        }).status_code == 403, (
+            'Проверьте, что смена роли сразу отражается на правах '
+            'пользователя со старым токеном.'
+        )
+        admin_client.delete('/api/v1/users/demoted/')
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_04_deferred_fields(self, admin, django_assert_num_queries):
+        user = ClaimsUser.from_claims(
+            id=admin.pk, username=admin.username, role=admin.role,
+            is_superuser=False, is_active=True
+        )
+        with django_assert_num_queries(0):
+            assert user.is_admin
+            assert user == admin
+        with django_assert_num_queries(1):
+            assert user.email == admin.email
+            assert user.bio == admin.bio
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import OutboxEmail
+from reviews.outbox import claim, deliver, queue_email
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25Outbox:
+    url_signup = '/api/v1/auth/signup/'
+
+    def test_01_signup_queues_email(self, client):
+        data = {'email': 'queued@yamdb.fake', 'username': 'queued'}
+        response = client.post(self.url_signup, data=data)
+        assert response.status_code == 200
+        assert mail.outbox == [], (
+            'Проверьте, что signup не отправляет письмо в запросе, а '
+            'ставит его в очередь.'
+        )
+        email = OutboxEmail.objects.get(recipient=data['email'])
+        assert email.status == OutboxEmail.PENDING
+
+        call_command('send_emails', once=True, verbosity=0)
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == [data['email']]
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.SENT
+        assert email.sent is not None
+
+    def test_02_repeat_signup_deduplicated(self, client):
+        data = {'email': 'twice@yamdb.fake', 'username': 'twice'}
+        client.post(self.url_signup, data=data)
+        queue_email(data['email'], 'Код подтверждения', 'новый код',
+                    'confirmation_code')
+        assert OutboxEmail.objects.filter(
+            recipient=data['email']
+        ).count() == 1, (
+            'Проверьте, что повторное письмо заменяет ждущее отправки.'
+        )
+        deliver()
+        assert [message.body for message in mail.outbox] == ['новый код']
+
+        queue_email(data['email'], 'Код подтверждения', 'ещё код',
+                    'confirmation_code')
+        assert OutboxEmail.objects.filter(
+            recipient=data['email']
+        ).count() == 2
+
+    def test_03_batch_uses_one_connection(self, settings):
+        settings.EMAIL_BACKEND = f'{__name__}.CountingBackend'
+        CountingBackend.opened = 0
+        for number in range(5):
+            queue_email(f'user{number}@yamdb.fake', 'Тема', 'Текст', 'test')
+        assert deliver() == (5, 0)
+        assert CountingBackend.opened == 1
+        assert len(mail.outbox) == 5
+
+    def test_04_retry_with_backoff(self, settings):
+        settings.EMAIL_BACKEND = f'{__name__}.FailingBackend'
+        settings.EMAIL_OUTBOX_RETRY_DELAY = 10
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        queue_email('retry@yamdb.fake', 'Тема', 'Текст', 'test')
+        started = timezone.now()
+
+        assert deliver() == (0, 1)
+        email = OutboxEmail.objects.get()
+        assert email.status == OutboxEmail.PENDING
+        assert email.attempts == 1
+        assert 'SMTP недоступен' in email.last_error
+        assert email.next_attempt >= started + timedelta(seconds=10)
+        assert deliver() == (0, 0), (
+            'Проверьте, что письмо не отправляется повторно до истечения '
+            'задержки.'
+        )
+
+        OutboxEmail.objects.update(next_attempt=timezone.now())
+        assert deliver() == (0, 1)
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.FAILED
+        assert email.attempts == 2
+
+    def test_05_batch_claimed_once(self):
+        queue_email('first@yamdb.fake', 'Тема', 'Текст', 'test')
+        [email] = claim(10, timezone.now())
+        assert claim(10, timezone.now()) == [], (
+            'Проверьте, что письмо из взятой пачки не получает второй '
+            'отправитель.'
+        )
+        queue_email('first@yamdb.fake', 'Тема', 'Новый текст', 'test')
+        assert deliver() == (1, 0)
+        assert mail.outbox[0].body == 'Новый текст'
+        assert OutboxEmail.objects.get().status == OutboxEmail.SENT
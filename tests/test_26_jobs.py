@@ -0,0 +1,115 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.jobs import claim, enqueue, requeue_stale, run_job
+from reviews.models import Job
+from reviews.outbox import queue_email
+
+calls = []
+barrier = threading.Barrier(1)
+
+
+def record(**kwargs):
+    calls.append(kwargs)
+
+
+def fail():
+    raise ValueError('ошибка задачи')
+
+
+def meet():
+    barrier.wait(timeout=5)
+
+
+@pytest.fixture(autouse=True)
+def job_settings(settings):
+    settings.JOB_PERIODIC = {}
+    settings.JOB_RETRY_DELAY = 10
+    calls.clear()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26Jobs:
+
+    def test_01_enqueue_and_run(self):
+        job = enqueue(record, title_id=1, name='Фильм')
+        later = enqueue(f'{__name__}.record', delay=60, title_id=2)
+        call_command('run_worker', once=True, verbosity=0)
+        assert calls == [{'title_id': 1, 'name': 'Фильм'}]
+        job.refresh_from_db()
+        assert job.status == Job.DONE
+        assert job.attempts == 1
+        later.refresh_from_db()
+        assert later.status == Job.QUEUED, (
+            'Проверьте, что отложенная задача не выполняется раньше срока.'
+        )
+
+    def test_02_retry_with_backoff(self):
+        job = enqueue(fail, max_attempts=2)
+        started = timezone.now()
+        [claimed] = claim(10, 'test')
+        assert not run_job(claimed)
+        job.refresh_from_db()
+        assert job.status == Job.QUEUED
+        assert 'ошибка задачи' in job.last_error
+        assert job.run_at >= started + timedelta(seconds=10)
+        assert claim(10, 'test') == []
+
+        Job.objects.update(run_at=timezone.now())
+        [claimed] = claim(10, 'test')
+        run_job(claimed)
+        job.refresh_from_db()
+        assert job.status == Job.FAILED
+        assert job.attempts == 2
+
+    def test_03_claim_once_and_requeue_stale(self, settings):
+        enqueue(record)
+        assert len(claim(10, 'first')) == 1
+        assert claim(10, 'second') == [], (
+            'Проверьте, что задачу, взятую в работу, не получает второй '
+            'воркер.'
+        )
+        settings.JOB_LOCK_TIMEOUT = 60
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        [stale] = Job.objects.all()
+        assert requeue_stale() == 1
+        assert len(claim(10, 'second')) == 1
+        run_job(stale)
+        assert Job.objects.get().status == Job.RUNNING, (
+            'Проверьте, что воркер, потерявший задачу, не сохраняет её '
+            'итог поверх нового владельца.'
+        )
+
+    def test_04_periodic_outbox_delivery(self, settings):
+        settings.JOB_PERIODIC = {'reviews.outbox.deliver': 5}
+        queue_email('job@yamdb.fake', 'Тема', 'Текст', 'test')
+        call_command('run_worker', once=True, verbosity=0)
+        assert [message.to for message in mail.outbox] == [
+            ['job@yamdb.fake']
+        ]
+        job = Job.objects.get(name='reviews.outbox.deliver')
+        assert job.status == Job.QUEUED
+        assert job.run_at > timezone.now(), (
+            'Проверьте, что периодическая задача переносится на следующий '
+            'период.'
+        )
+
+        call_command('run_worker', once=True, verbosity=0)
+        settings.JOB_PERIODIC = {}
+        call_command('run_worker', once=True, verbosity=0)
+        assert not Job.objects.exists()
+
+    def test_05_concurrency(self):
+        global barrier
+        barrier = threading.Barrier(3)
+        for _ in range(3):
+            enqueue(meet)
+        call_command('run_worker', once=True, concurrency=3, verbosity=0)
+        assert set(Job.objects.values_list('status', flat=True)) == {
+            Job.DONE
+        }, 'Проверьте, что задачи выполняются параллельно в пуле потоков.'
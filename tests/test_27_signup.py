@@ -0,0 +1,81 @@
+import pytest
+from django.db import connection
+
+from reviews.models import CustomUser, OutboxEmail
+
+URL_SIGNUP = '/api/v1/auth/signup/'
+
+
+class Statements:
+    """SQL-запросы без управления транзакциями."""
+
+    def __init__(self):
+        self.sql = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(('BEGIN', 'SAVEPOINT', 'RELEASE',
+                               'ROLLBACK')):
+            self.sql.append(sql.split(None, 1)[0])
+        return execute(sql, params, many, context)
+
+
+def signup(client, data):
+    statements = Statements()
+    with connection.execute_wrapper(statements):
+        response = client.post(URL_SIGNUP, data=data)
+    return response, statements.sql
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27Signup:
+    data = {'username': 'single', 'email': 'single@yamdb.fake'}
+
+    def test_01_new_user_single_lookup(self, client):
+        response, statements = signup(client, self.data)
+        assert response.status_code == 200
+        assert statements == ['SELECT', 'INSERT', 'INSERT'], (
+            'Проверьте, что регистрация нового пользователя выполняет один '
+            'запрос поиска, вставку пользователя и вставку письма.'
+        )
+        user = CustomUser.objects.get(username=self.data['username'])
+        assert len(user.confirmation_code) == 32
+
+    def test_02_repeat_signup_single_lookup(self, client):
+        client.post(URL_SIGNUP, data=self.data)
+        OutboxEmail.objects.update(status=OutboxEmail.SENT)
+        code = CustomUser.objects.get().confirmation_code
+
+        response, statements = signup(client, self.data)
+        assert response.status_code == 200
+        assert statements == ['SELECT', 'INSERT'], (
+            'Проверьте, что повторная регистрация той же пары выполняет '
+            'один запрос поиска и вставку письма.'
+        )
+        assert CustomUser.objects.get().confirmation_code == code
+        assert OutboxEmail.objects.filter(
+            status=OutboxEmail.PENDING, body__startswith=code
+        ).exists()
+
+    def test_03_conflicts(self, client):
+        client.post(URL_SIGNUP, data=self.data)
+        for data, field in (
+            ({'username': 'other', 'email': self.data['email']}, 'email'),
+            ({'username': self.data['username'],
+              'email': 'other@yamdb.fake'}, 'username'),
+        ):
+            response, statements = signup(client, data)
+            assert response.status_code == 400
+            assert field in response.json()
+            assert statements == ['SELECT']
+        assert CustomUser.objects.count() == 1
+
+    def test_04_user_created_by_admin_gets_code(self, client):
+        CustomUser.objects.create(**self.data)
+        response = client.post(URL_SIGNUP, data=self.data)
+        assert response.status_code == 200
+        code = CustomUser.objects.get().confirmation_code
+        assert code, (
+            'Проверьте, что пользователь, созданный администратором, '
+            'получает код подтверждения при регистрации.'
+        )
+        assert OutboxEmail.objects.get().body.startswith(code)